@@ -0,0 +1,259 @@
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+import yaml
+
+from main import load_parameters, run_pipeline, validate_config, validate_parameters, PipelineError
+from utils.profiling import append_report
+
+STAGES = ("load", "clean", "detect", "merge", "write_debug", "write_raster", "write_svg")
+
+def parse_arguments():
+    """Parses command line arguments."""
+    parser = argparse.ArgumentParser(description="Generate floor plans for many maps in parallel.")
+    parser.add_argument(
+        "inputs",
+        nargs="+",
+        help="Map YAMLs or pipeline config YAMLs: files, directories (all *.yaml inside) or glob patterns.",
+    )
+    parser.add_argument(
+        "--config",
+        type=str,
+        default=None,
+        help="Base configuration YAML applied to plain map YAMLs (configs bring their own parameters).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of worker processes.",
+    )
+    parser.add_argument(
+        "--opencv-threads",
+        type=int,
+        default=1,
+        help="OpenCV threads per worker (keep low to avoid oversubscribing the pool).",
+    )
+    parser.add_argument(
+        "--validate-only",
+        action="store_true",
+        help="Check every input (and --config) without running the pipeline or loading OpenCV.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Bypass the stage cache even if CACHE_DIR is configured.",
+    )
+    parser.add_argument(
+        "--no-debug-images",
+        action="store_true",
+        help="Skip the four debug PNGs for every map.",
+    )
+    parser.add_argument(
+        "--summary-json",
+        type=str,
+        default=None,
+        help="Optional path for a JSON summary of all maps.",
+    )
+    parser.add_argument(
+        "--report",
+        type=str,
+        default=None,
+        help="Append one JSON line per map with per-stage time, CPU, memory and counts.",
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Show the per-map pipeline logs instead of only the summary.",
+    )
+    return parser.parse_args()
+
+def expand_inputs(inputs):
+    """Resolves files, directories and glob patterns to a sorted, de-duplicated list of YAML files."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(glob.glob(os.path.join(item, "*.yaml")) + glob.glob(os.path.join(item, "*.yml")))
+        elif any(c in item for c in "*?["):
+            paths.extend(glob.glob(item, recursive=True))
+        else:
+            paths.append(item)
+    return sorted(set(os.path.normpath(p) for p in paths))
+
+def params_for_yaml(yaml_path, base_params):
+    """
+    Builds pipeline parameters for one input YAML.
+
+    Pipeline configs (with INPUT_YAML_FILE) are loaded as-is. Map YAMLs (with an
+    `image` entry) reuse the base parameters with per-map output file names.
+    """
+    with open(yaml_path, 'r') as f:
+        data = yaml.safe_load(f) or {}
+    if "INPUT_YAML_FILE" in data:
+        return load_parameters(yaml_path)
+    if "image" not in data:
+        raise PipelineError(f"'{yaml_path}' is neither a map YAML nor a pipeline config.")
+
+    name = os.path.splitext(os.path.basename(yaml_path))[0]
+    params = dict(base_params)
+    params.update({
+        "INPUT_YAML_FILE": yaml_path,
+        "OUTPUT_RASTER_FLOORPLAN_FILE": f"floorplan_raster_{name}.png",
+        "OUTPUT_VECTOR_FLOORPLAN_FILE": f"floorplan_vector_{name}.svg",
+        "OUTPUT_PREPROCESSED_FILE": f"debug_preprocessed_{name}.png",
+        "OUTPUT_CLEANED_FILE": f"debug_cleaned_{name}.png",
+        "OUTPUT_RAW_LINES_FILE": f"debug_raw_lines_{name}.png",
+        "OUTPUT_MERGED_LINES_FILE": f"debug_merged_lines_{name}.png",
+    })
+    return params
+
+def validate_one(yaml_path, base_params):
+    """Problems with one input YAML, see main.validate_parameters (empty if it can run)."""
+    try:
+        with open(yaml_path, 'r') as f:
+            data = yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError) as e:
+        return [f"{type(e).__name__}: {e}"]
+    if isinstance(data, dict) and "INPUT_YAML_FILE" in data: return validate_config(yaml_path)
+    try:
+        params = params_for_yaml(yaml_path, base_params)
+    except PipelineError as e:
+        return [str(e)]
+    return validate_parameters(params)
+
+def validate_all(yaml_files, config_file, base_params):
+    """Prints the problems of --config and every input. Returns the number of invalid files."""
+    checks = [(config_file, validate_config(config_file))] if config_file else []
+    checks += [(path, validate_one(path, base_params)) for path in yaml_files]
+    for path, problems in checks:
+        print(f"{path}: {'OK' if not problems else f'{len(problems)} problem(s)'}")
+        for problem in problems: print(f"  {problem}")
+    invalid = sum(bool(problems) for _, problems in checks)
+    print(f"{len(checks)} files, {len(checks) - invalid} ok, {invalid} with problems")
+    return invalid
+
+def init_worker(opencv_threads):
+    import cv2
+    cv2.setNumThreads(opencv_threads)
+
+def process_one(yaml_path, base_params, verbose=False, no_cache=False, no_debug_images=False):
+    """Runs the pipeline for one YAML and never raises: failures are reported in the result."""
+    start = time.perf_counter()
+    log = io.StringIO()
+    result = {"input": yaml_path, "status": "ok"}
+    try:
+        with contextlib.redirect_stdout(sys.stdout if verbose else log):
+            params = params_for_yaml(yaml_path, base_params)
+            if no_cache: params["CACHE_DIR"] = ""
+            if no_debug_images: params["WRITE_DEBUG_IMAGES"] = False
+            result.update(run_pipeline(params))
+    except PipelineError as e:
+        result.update(status="failed", error=str(e))
+    except Exception as e:
+        result.update(status="failed", error=f"{type(e).__name__}: {e}", traceback=traceback.format_exc())
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+def failed_result(yaml_path, error):
+    return {"input": yaml_path, "status": "failed", "error": error, "seconds": 0.0}
+
+def run_batch(yaml_files, base_params, workers, opencv_threads, options=(), process_fn=process_one):
+    """
+    Runs process_fn(path, base_params, *options) for every YAML on a process pool and returns
+    one result per map, in completion order.
+
+    At most `workers` maps are in flight, so when a worker process dies (OOM, segfault) the pool
+    breaks with only those maps affected. The pool is restarted, maps that were never submitted
+    continue as before, and the affected maps are rerun one at a time: a map that breaks the pool
+    on its own is reported as failed instead of aborting the batch.
+    """
+    def new_pool():
+        return ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(opencv_threads,))
+
+    results = []
+    queue = list(yaml_files)
+    alone = [] # Maps that were in flight when the pool broke
+    in_flight = {}
+    pool = new_pool()
+    try:
+        while queue or alone or in_flight:
+            while alone and not in_flight:
+                path = alone.pop(0)
+                in_flight[pool.submit(process_fn, path, base_params, *options)] = (path, True)
+            while queue and not alone and len(in_flight) < workers:
+                path = queue.pop(0)
+                in_flight[pool.submit(process_fn, path, base_params, *options)] = (path, False)
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            broken = False
+            for future in done:
+                path, isolated = in_flight.pop(future)
+                try:
+                    results.append(future.result())
+                except BrokenProcessPool:
+                    broken = True
+                    if isolated: results.append(failed_result(path, "Worker process died while processing this map"))
+                    else: alone.append(path)
+                except Exception as e:
+                    results.append(failed_result(path, f"{type(e).__name__}: {e}"))
+            if broken:
+                # Every other task of the broken pool fails too; rerun them alone
+                for future in wait(in_flight).done:
+                    path, _ = in_flight.pop(future)
+                    try:
+                        results.append(future.result())
+                    except BrokenProcessPool:
+                        alone.append(path)
+                    except Exception as e:
+                        results.append(failed_result(path, f"{type(e).__name__}: {e}"))
+                print(f"Warning: a worker process died, restarting the pool ({len(alone)} maps to rerun one at a time).")
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = new_pool()
+    finally:
+        pool.shutdown(cancel_futures=True)
+    return results
+
+def print_summary(results, wall_seconds):
+    header = f"{'map':<24} {'status':<7} {'raw':>6} {'merged':>6} {'total_s':>8} " + " ".join(f"{s + '_s':>11}" for s in STAGES)
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        name = r.get("map") or os.path.basename(r["input"])
+        if r["status"] == "ok":
+            stages = " ".join(f"{r['timings'].get(s, 0.0):>11.3f}" for s in STAGES)
+            print(f"{name:<24} {'ok':<7} {r['raw_lines']:>6} {r['merged_lines']:>6} {r['seconds']:>8.3f} {stages}")
+        else:
+            print(f"{name:<24} {'FAILED':<7} {'-':>6} {'-':>6} {r['seconds']:>8.3f} {r['error']}")
+    failed = sum(r["status"] != "ok" for r in results)
+    print(f"{len(results)} maps, {len(results) - failed} ok, {failed} failed in {wall_seconds:.2f} s wall time")
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    yaml_files = expand_inputs(args.inputs)
+    if not yaml_files: exit("Error: no YAML files matched the given inputs.")
+    with contextlib.redirect_stdout(io.StringIO()):
+        base_params = load_parameters(args.config)
+    if args.validate_only: sys.exit(1 if validate_all(yaml_files, args.config, base_params) else 0)
+
+    start = time.perf_counter()
+    results = run_batch(yaml_files, base_params, max(1, args.workers), args.opencv_threads,
+                        (args.verbose, args.no_cache, args.no_debug_images))
+    results.sort(key=lambda r: r["input"])
+    print_summary(results, time.perf_counter() - start)
+
+    if args.summary_json:
+        with open(args.summary_json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.report:
+        for r in results:
+            append_report(args.report, r.get("profile") or {"run": r["input"], "error": r.get("error")})
+    if any(r["status"] != "ok" for r in results): sys.exit(1)
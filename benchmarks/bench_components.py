@@ -0,0 +1,90 @@
+"""
+Benchmark: whole-map detect + merge vs the per-component merge (COMPONENT_WORKERS).
+
+Builds a synthetic site of --wings separate buildings (laid out on a grid with free space
+between them), then times detect + merge on the whole map and with the merge run per
+component for each worker count. Hough runs on the whole map in both cases. It checks that
+the per-component merge gives the same set of walls as the whole-map merge, i.e. that no
+merge across components is lost. Speedups need as many free cores as workers.
+
+    python benchmarks/bench_components.py --wings 4 9 --workers 1 2 4 8
+"""
+import argparse
+import contextlib
+import io
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from main import load_parameters, pixel_parameters, component_partition, detect_walls, merge_walls
+from synthetic_map import generate_occupancy_grid, FREE_PGM_VAL
+from utils.preprocess import binarize_and_clean
+
+def synthetic_site(num_wings, wing_px, spacing_px, resolution, seed=0):
+    """num_wings synthetic floors on a square grid, spacing_px of free space apart."""
+    per_row = math.ceil(math.sqrt(num_wings))
+    rows = math.ceil(num_wings / per_row)
+    step = wing_px + spacing_px
+    grid = np.full((rows * step + spacing_px, per_row * step + spacing_px), FREE_PGM_VAL, dtype=np.uint8)
+    for i in range(num_wings):
+        y0, x0 = spacing_px + (i // per_row) * step, spacing_px + (i % per_row) * step
+        grid[y0:y0 + wing_px, x0:x0 + wing_px] = generate_occupancy_grid(wing_px, wing_px, resolution=resolution, seed=seed + i)
+    return grid
+
+def best_of(fn, repeats):
+    best, result = float("inf"), None
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeats):
+            start = time.perf_counter()
+            result = fn()
+            best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the per-component merge against the whole map.")
+    parser.add_argument("--wings", type=int, nargs="+", default=[4, 9])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--wing-m", type=float, default=40.0, help="Side of each wing in meters.")
+    parser.add_argument("--spacing-m", type=float, default=5.0, help="Free space between wings in meters.")
+    parser.add_argument("--resolution", type=float, default=0.05)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        params = load_parameters(os.path.join(ROOT, "configs", "config_room1.yaml"))
+
+    print(f"{'wings':>5} {'shape':>11} {'workers':>7} {'components':>10} {'total_s':>8} {'speedup':>8} "
+          f"{'raw':>6} {'walls':>6} {'merge_identical':>15}")
+    for num_wings in args.wings:
+        grid = synthetic_site(num_wings, int(args.wing_m / args.resolution), int(args.spacing_m / args.resolution), args.resolution, args.seed)
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, cleaned = binarize_and_clean(grid, 0, params)
+            min_px, gap_px, merge_dist = pixel_parameters(args.resolution, params)
+        shape = f"{grid.shape[1]}x{grid.shape[0]}"
+
+        def whole():
+            raw = detect_walls(cleaned, min_px, gap_px, merge_dist, params)
+            return raw, merge_walls(raw, merge_dist, params)
+        full_total, (full_raw, full_merged) = best_of(whole, args.repeats)
+        print(f"{num_wings:>5} {shape:>11} {'whole':>7} {1:>10} {full_total:>8.3f} {'1.00x':>8} {len(full_raw):>6} {len(full_merged):>6} {'':>15}")
+
+        for workers in args.workers:
+            worker_params = dict(params, COMPONENT_WORKERS=workers)
+            def per_component():
+                partition = component_partition(cleaned, gap_px, merge_dist, worker_params)
+                raw = detect_walls(cleaned, min_px, gap_px, merge_dist, worker_params)
+                return partition, raw, merge_walls(raw, merge_dist, worker_params, partition)
+            total, (partition, raw, merged) = best_of(per_component, args.repeats)
+            identical = sorted(map(str, merged)) == sorted(map(str, full_merged))
+            print(f"{num_wings:>5} {shape:>11} {workers:>7} {partition.count:>10} {total:>8.3f} {full_total / total:>7.2f}x "
+                  f"{len(raw):>6} {len(merged):>6} {str(identical):>15}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark for line merging: merge_lines (pairwise reference) vs merge_lines_indexed.
+
+Generates synthetic Hough-like segments (fragmented axis-aligned and diagonal walls with
+pixel jitter), times both engines for growing segment counts, and checks that the outputs
+are identical wherever the reference is run. A second table times the group-extent
+methods ("farthest" vs "pca") on the same groups, and a third compares
+merge_lines_manhattan (snap tolerance --snap) with merge_lines_indexed: time, merged walls
+and the share of Manhattan walls that lie within --dist of an indexed wall.
+
+    python benchmarks/bench_merge.py --sizes 500 1000 2000 4000 8000 16000 32000
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.wall_detection import EXTENT_METHODS, _segment_array, group_lines_indexed, merge_lines, merge_lines_indexed
+from utils.wall_detection import point_segment_distance
+from utils.manhattan import merge_lines_manhattan
+
+def synthetic_segments(num_segments, seed=0, fragment_px=40, jitter_px=2):
+    """Hough-style (N, 1, 4) int32 segments: walls broken into short jittered fragments."""
+    rng = np.random.default_rng(seed)
+    extent = int(np.sqrt(num_segments) * 60) + 200
+    segs = []
+    while len(segs) < num_segments:
+        x0, y0 = rng.integers(0, extent, size=2)
+        angle = rng.choice([0.0, 90.0, rng.uniform(0, 180)], p=[0.45, 0.45, 0.1])
+        length = rng.integers(fragment_px * 2, fragment_px * 20)
+        dx, dy = np.cos(np.radians(angle)), np.sin(np.radians(angle))
+        for s in range(0, int(length), fragment_px):
+            e = min(length, s + fragment_px - rng.integers(0, 5))
+            seg = [x0 + dx * s, y0 + dy * s, x0 + dx * e, y0 + dy * e] + rng.integers(-jitter_px, jitter_px + 1, size=4)
+            segs.append(np.clip(seg, 0, None))
+    order = rng.permutation(len(segs))[:num_segments]
+    return np.asarray(segs, dtype=np.int32)[order].reshape(-1, 1, 4)
+
+def timed(fn, *args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+    return result, elapsed
+
+def covered(walls, reference, dist):
+    """Share of walls whose endpoints both lie within dist of some reference wall."""
+    ref = _segment_array(reference)
+    hits = 0
+    for (x1, y1, x2, y2), in walls:
+        near = ref[(np.minimum(ref[:, 0], ref[:, 2]) <= max(x1, x2) + dist) & (np.maximum(ref[:, 0], ref[:, 2]) >= min(x1, x2) - dist) &
+                   (np.minimum(ref[:, 1], ref[:, 3]) <= max(y1, y2) + dist) & (np.maximum(ref[:, 1], ref[:, 3]) >= min(y1, y2) - dist)]
+        hits += any(point_segment_distance((x1, y1), r[:2], r[2:]) <= dist and point_segment_distance((x2, y2), r[:2], r[2:]) <= dist for r in near)
+    return hits / max(len(walls), 1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark merge_lines vs merge_lines_indexed.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 1000, 2000, 4000, 8000, 16000, 32000])
+    parser.add_argument("--max-reference", type=int, default=4000, help="Largest size to run the O(N^2) reference on.")
+    parser.add_argument("--angle", type=float, default=10.0)
+    parser.add_argument("--dist", type=float, default=18)
+    parser.add_argument("--snap", type=float, default=2.0, help="Manhattan snap tolerance in degrees.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'segments':>9} {'merged':>7} {'reference_s':>12} {'indexed_s':>10} {'speedup':>8} {'identical':>9}")
+    for n in args.sizes:
+        lines = synthetic_segments(n, seed=args.seed)
+        fast, t_fast = timed(merge_lines_indexed, lines, args.angle, args.dist)
+        if n <= args.max_reference:
+            ref, t_ref = timed(merge_lines, lines, args.angle, args.dist)
+            print(f"{n:>9} {len(fast):>7} {t_ref:>12.3f} {t_fast:>10.3f} {t_ref / t_fast:>7.1f}x {str(ref == fast):>9}")
+        else:
+            print(f"{n:>9} {len(fast):>7} {'-':>12} {t_fast:>10.3f} {'-':>8} {'-':>9}")
+
+    print()
+    print(f"{'segments':>9} {'largest_group':>13} " + " ".join(f"{m + '_s':>11}" for m in EXTENT_METHODS))
+    for n in args.sizes:
+        segs = _segment_array(synthetic_segments(n, seed=args.seed))
+        groups = group_lines_indexed(segs, args.angle, args.dist)
+        times = [timed(fn, segs, groups)[1] for fn in EXTENT_METHODS.values()]
+        print(f"{n:>9} {max(len(g) for g in groups):>13} " + " ".join(f"{t:>11.4f}" for t in times))
+
+    print()
+    print(f"{'segments':>9} {'indexed_s':>10} {'manhattan_s':>12} {'speedup':>8} {'indexed':>8} {'manhattan':>9} {'covered':>8}")
+    for n in args.sizes:
+        lines = synthetic_segments(n, seed=args.seed)
+        indexed, t_indexed = timed(merge_lines_indexed, lines, args.angle, args.dist)
+        manhattan, t_manhattan = timed(merge_lines_manhattan, lines, args.angle, args.dist, "farthest", args.snap)
+        print(f"{n:>9} {t_indexed:>10.3f} {t_manhattan:>12.3f} {t_indexed / t_manhattan:>7.1f}x {len(indexed):>8} {len(manhattan):>9} "
+              f"{covered(manhattan, indexed, args.dist):>8.3f}")
+
+if __name__ == "__main__":
+    main()
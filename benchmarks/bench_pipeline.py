@@ -0,0 +1,146 @@
+"""
+Pipeline scaling benchmark on synthetic occupancy grids.
+
+Generates maps of increasing size (see synthetic_map.py), times every stage, checks that
+optimized stages match the reference implementation, and saves the results as JSON so
+runs from different commits can be compared.
+
+    python benchmarks/bench_pipeline.py --sizes-mp 0.5 1 2 4 8
+    python benchmarks/bench_pipeline.py --compare benchmarks/results/bench_<old>.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from main import load_parameters
+from synthetic_map import generate_occupancy_grid
+from utils.preprocess import preprocess_map, clean_map, binarize_and_clean
+from utils.wall_detection import detect_raw_lines, merge_lines, merge_lines_indexed
+from utils.utils import draw_raster_floorplan, save_svg_floorplan
+
+# Optimized stage -> reference stage it must reproduce
+EQUIVALENT_STAGES = {"binarize_and_clean": "clean_map", "merge_lines_indexed": "merge_lines"}
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def best_of(fn, repeats):
+    """Minimum wall time over repeats and the last result."""
+    best, result = float("inf"), None
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeats):
+            start = time.perf_counter()
+            result = fn()
+            best = min(best, time.perf_counter() - start)
+    return best, result
+
+def bench_size(megapixels, params, args, out_dir):
+    """Times all stages on one synthetic map. Returns a list of result rows."""
+    height = int(np.sqrt(megapixels * 1e6 * 3 / 4))
+    width = int(height * 4 / 3)
+    grid = generate_occupancy_grid(width, height, resolution=args.resolution, wall_density=args.wall_density,
+                                   noise=args.noise, unknown_ratio=args.unknown_ratio, seed=args.seed)
+    min_len = max(1, int(params["MIN_LINE_LENGTH_METERS"] / args.resolution))
+    max_gap = max(1, int(params["MAX_LINE_GAP_METERS"] / args.resolution))
+    angle, dist = params["MERGE_ANGLE_THRESHOLD_DEG"], params["MERGE_DISTANCE_THRESHOLD_PX"]
+    rows, outputs = [], {}
+
+    def run(stage, fn, items=None):
+        seconds, result = best_of(fn, args.repeats)
+        outputs[stage] = result
+        rows.append({"megapixels": megapixels, "shape": [height, width], "stage": stage, "seconds": seconds,
+                     "items": items(result) if items else None})
+        return result
+
+    binary = run("preprocess_map", lambda: preprocess_map(grid, 0, params))
+    cleaned = run("clean_map", lambda: clean_map(binary, params))
+    run("binarize_and_clean", lambda: binarize_and_clean(grid, 0, params))
+    raw = run("detect_raw_lines", lambda: detect_raw_lines(cleaned, min_len, max_gap, params), len)
+    if len(raw) <= args.max_reference_segments:
+        run("merge_lines", lambda: merge_lines(raw, angle, dist), len)
+    merged = run("merge_lines_indexed", lambda: merge_lines_indexed(raw, angle, dist), len)
+    run("draw_raster_floorplan", lambda: draw_raster_floorplan(grid.shape, merged, os.path.join(out_dir, "raster.png"), params))
+    run("save_svg_floorplan", lambda: save_svg_floorplan(grid.shape, merged, os.path.join(out_dir, "vector.svg"), params))
+
+    # Equivalence of optimized stages with their references
+    checks = {}
+    checks["binarize_and_clean"] = bool(np.array_equal(cv2.bitwise_not(outputs["clean_map"]), outputs["binarize_and_clean"][1]))
+    if "merge_lines" in outputs:
+        checks["merge_lines_indexed"] = outputs["merge_lines"] == outputs["merge_lines_indexed"]
+    for row in rows:
+        if row["stage"] in checks: row["matches_reference"] = checks[row["stage"]]
+    return rows
+
+def print_rows(rows):
+    print(f"{'MP':>6} {'stage':<24} {'seconds':>10} {'items':>8} {'matches_ref':>11}")
+    for r in rows:
+        items = "" if r["items"] is None else r["items"]
+        match = {True: "yes", False: "NO"}.get(r.get("matches_reference"), "")
+        print(f"{r['megapixels']:>6} {r['stage']:<24} {r['seconds']:>10.4f} {items:>8} {match:>11}")
+
+def compare(current, baseline):
+    base = {(r["megapixels"], r["stage"]): r["seconds"] for r in baseline["results"]}
+    print(f"\nComparison with {baseline['revision']} (ratio < 1 means faster now)")
+    print(f"{'MP':>6} {'stage':<24} {'baseline_s':>10} {'current_s':>10} {'ratio':>7}")
+    for r in current["results"]:
+        key = (r["megapixels"], r["stage"])
+        if key in base:
+            print(f"{key[0]:>6} {key[1]:<24} {base[key]:>10.4f} {r['seconds']:>10.4f} {r['seconds'] / base[key]:>7.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every pipeline stage on synthetic maps.")
+    parser.add_argument("--sizes-mp", type=float, nargs="+", default=[0.5, 1, 2, 4, 8], help="Map sizes in megapixels.")
+    parser.add_argument("--resolution", type=float, default=0.05)
+    parser.add_argument("--wall-density", type=float, default=0.25)
+    parser.add_argument("--noise", type=float, default=0.002)
+    parser.add_argument("--unknown-ratio", type=float, default=0.15)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--max-reference-segments", type=int, default=3000, help="Skip the O(N^2) merge_lines above this.")
+    parser.add_argument("--config", type=str, default=os.path.join(ROOT, "configs", "config_room1.yaml"))
+    parser.add_argument("--out", type=str, default=None, help="Results JSON (default: benchmarks/results/bench_<rev>.json).")
+    parser.add_argument("--compare", type=str, default=None, help="Baseline results JSON to compare against.")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        params = load_parameters(args.config)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as out_dir:
+        for mp in args.sizes_mp:
+            rows.extend(bench_size(mp, params, args, out_dir))
+    print_rows(rows)
+
+    revision = git_revision()
+    results = {"revision": revision, "created": time.time(), "machine": platform.platform(),
+               "python": platform.python_version(), "opencv": cv2.__version__, "numpy": np.__version__,
+               "settings": {k: v for k, v in vars(args).items() if k not in ("out", "compare")}, "results": rows}
+    out = args.out or os.path.join(ROOT, "benchmarks", "results", f"bench_{revision}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+    if any(r.get("matches_reference") is False for r in rows): sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Microbenchmark: preprocess_map + clean_map + inversion vs the fused binarize_and_clean.
+
+For each bundled room map (optionally tiled up to larger sizes) it reports the median time
+of both paths, the peak memory they allocate (tracemalloc sees NumPy and OpenCV output
+arrays) and checks that the Hough input images are identical.
+
+    python benchmarks/bench_preprocess.py --scales 1 4
+"""
+import argparse
+import contextlib
+import glob
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from main import load_parameters
+from utils.preprocess import preprocess_map, clean_map, binarize_and_clean
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def unfused(img, params):
+    return cv2.bitwise_not(clean_map(preprocess_map(img, 0, params), params))
+
+def fused(img, params, buffers):
+    return binarize_and_clean(img, 0, params, buffers)
+
+def measure(fn, repeats):
+    """Median wall time over repeats and peak traced allocation of one call."""
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return float(np.median(times)), peak
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fused vs unfused binarize/clean.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 4], help="Tile each map NxN times.")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        params = load_parameters(os.path.join(ROOT, "configs", "config_room1.yaml"))
+
+    print(f"{'map':<10} {'shape':>12} {'unfused_ms':>11} {'fused_ms':>9} {'speedup':>8} {'unfused_MB':>11} {'fused_MB':>9} {'identical':>9}")
+    for pgm in sorted(glob.glob(os.path.join(ROOT, "metadata", "*.pgm"))):
+        base = cv2.imread(pgm, cv2.IMREAD_UNCHANGED)
+        for scale in args.scales:
+            img = np.tile(base, (scale, scale))
+            with contextlib.redirect_stdout(io.StringIO()):
+                buffers = fused(img, params, None) # Warm, preallocated output buffers
+                identical = np.array_equal(unfused(img, params), buffers[1])
+            t_old, m_old = measure(lambda: unfused(img, params), args.repeats)
+            t_new, m_new = measure(lambda: fused(img, params, buffers), args.repeats)
+            name = f"{os.path.splitext(os.path.basename(pgm))[0]}x{scale}"
+            shape = f"{img.shape[0]}x{img.shape[1]}"
+            print(f"{name:<10} {shape:>12} {t_old * 1e3:>11.2f} {t_new * 1e3:>9.2f} {t_old / t_new:>7.1f}x "
+                  f"{m_old / 2**20:>11.1f} {m_new / 2**20:>9.1f} {str(identical):>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark: full-resolution Hough vs coarse-to-fine (pyramid) detection.
+
+For synthetic maps at several resolutions (walls get thicker in pixels as the resolution
+gets finer) it times detection + merge for each pyramid level and reports how well the
+merged walls agree with the full-resolution result:
+
+    precision  share of pyramid wall pixels within --tolerance-px of a full-resolution wall
+    recall     share of full-resolution wall pixels within --tolerance-px of a pyramid wall
+    length     total pyramid wall length / total full-resolution wall length
+
+    python benchmarks/bench_pyramid.py --resolutions 0.05 0.02 0.01 --levels 1 2 3
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from main import load_parameters, pixel_parameters
+from synthetic_map import generate_occupancy_grid
+from utils.preprocess import binarize_and_clean
+from utils.wall_detection import detect_raw_lines_occupancy, merge_lines_indexed
+from utils.pyramid import detect_raw_lines_pyramid
+from utils.segments import WallSegments
+
+def best_of(fn, repeats):
+    best, result = float("inf"), None
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeats):
+            start = time.perf_counter()
+            result = fn()
+            best = min(best, time.perf_counter() - start)
+    return best, result
+
+def rasterize(shape, walls):
+    img = np.zeros(shape, dtype=np.uint8)
+    cv2.polylines(img, walls.endpoints.reshape(-1, 2, 2), False, 255, 1)
+    return img > 0
+
+def agreement(shape, walls, reference, tolerance_px):
+    """(precision, recall, length ratio) of walls against the reference walls."""
+    drawn, ref = rasterize(shape, walls), rasterize(shape, reference)
+    dist_to_ref = cv2.distanceTransform((~ref).astype(np.uint8), cv2.DIST_L2, 3)
+    dist_to_drawn = cv2.distanceTransform((~drawn).astype(np.uint8), cv2.DIST_L2, 3)
+    precision = float((dist_to_ref[drawn] <= tolerance_px).mean()) if drawn.any() else 0.0
+    recall = float((dist_to_drawn[ref] <= tolerance_px).mean()) if ref.any() else 0.0
+    return precision, recall, float(walls.lengths.sum() / max(reference.lengths.sum(), 1))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark coarse-to-fine wall detection against full resolution.")
+    parser.add_argument("--resolutions", type=float, nargs="+", default=[0.05, 0.02, 0.01], help="Meters per pixel.")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--width-m", type=float, default=60.0)
+    parser.add_argument("--height-m", type=float, default=45.0)
+    parser.add_argument("--wall-thickness-m", type=float, default=0.08)
+    parser.add_argument("--diagonal-ratio", type=float, default=0.2)
+    parser.add_argument("--tolerance-px", type=float, default=3.0)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        params = load_parameters(os.path.join(ROOT, "configs", "config_room1.yaml"))
+    angle = params["MERGE_ANGLE_THRESHOLD_DEG"]
+
+    print(f"{'res_m':>6} {'shape':>11} {'levels':>6} {'detect_s':>9} {'merge_s':>8} {'total_s':>8} {'speedup':>8} "
+          f"{'raw':>6} {'walls':>6} {'precision':>9} {'recall':>7} {'length':>7}")
+    for resolution in args.resolutions:
+        grid = generate_occupancy_grid(int(args.width_m / resolution), int(args.height_m / resolution), resolution=resolution,
+                                       wall_thickness_px=max(2, int(round(args.wall_thickness_m / resolution))),
+                                       diagonal_ratio=args.diagonal_ratio, seed=args.seed)
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, cleaned = binarize_and_clean(grid, 0, params)
+            min_px, gap_px, merge_dist = pixel_parameters(resolution, params)
+        shape = f"{grid.shape[1]}x{grid.shape[0]}"
+
+        t_detect, raw = best_of(lambda: detect_raw_lines_occupancy(cleaned, min_px, gap_px, params), args.repeats)
+        t_merge, merged = best_of(lambda: merge_lines_indexed(raw, angle, merge_dist), args.repeats)
+        reference, full_total = WallSegments.from_lines(merged), t_detect + t_merge
+        print(f"{resolution:>6} {shape:>11} {'full':>6} {t_detect:>9.3f} {t_merge:>8.3f} {full_total:>8.3f} {'1.00x':>8} "
+              f"{len(raw):>6} {len(merged):>6} {'':>9} {'':>7} {'':>7}")
+        for levels in args.levels:
+            t_detect, raw = best_of(lambda: detect_raw_lines_pyramid(cleaned, min_px, gap_px, params, levels, angle, merge_dist), args.repeats)
+            t_merge, merged = best_of(lambda: merge_lines_indexed(raw, angle, merge_dist), args.repeats)
+            precision, recall, length = agreement(grid.shape, WallSegments.from_lines(merged), reference, args.tolerance_px)
+            total = t_detect + t_merge
+            print(f"{resolution:>6} {shape:>11} {levels:>6} {t_detect:>9.3f} {t_merge:>8.3f} {total:>8.3f} {full_total / total:>7.2f}x "
+                  f"{len(raw):>6} {len(merged):>6} {precision:>9.3f} {recall:>7.3f} {length:>7.2f}")
+
+if __name__ == "__main__":
+    main()
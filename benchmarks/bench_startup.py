@@ -0,0 +1,83 @@
+"""
+Startup-time benchmark for the command line entry points.
+
+Runs each command in a fresh interpreter --repeats times and reports the median and
+minimum wall time, plus whether OpenCV and NumPy were imported (from `python -X importtime`).
+`import cv2` alone is included as the reference cost that lazy imports avoid. Results are
+saved as JSON so runs from different commits can be compared.
+
+    python benchmarks/bench_startup.py --repeats 10
+    python benchmarks/bench_startup.py --compare benchmarks/results/startup_<old>.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_pipeline import git_revision
+
+def commands(config):
+    return {
+        "python -c pass": ["-c", "pass"],
+        "import cv2": ["-c", "import cv2"],
+        "import main": ["-c", "import main"],
+        "main.py --help": ["main.py", "--help"],
+        "main.py --validate-only": ["main.py", "--validate-only", "--config", config],
+        "batch.py --validate-only": ["batch.py", config, "--validate-only"],
+    }
+
+def run_once(argv):
+    start = time.perf_counter()
+    subprocess.run([sys.executable] + argv, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - start
+
+def imported_modules(argv):
+    """Top-level modules a command imports, from the -X importtime log on stderr."""
+    log = subprocess.run([sys.executable, "-X", "importtime"] + argv, cwd=ROOT, stdout=subprocess.DEVNULL,
+                         stderr=subprocess.PIPE, text=True).stderr
+    return {line.rsplit("|", 1)[-1].strip().split(".")[0] for line in log.splitlines() if line.startswith("import time:")}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark command line startup time.")
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--config", type=str, default=os.path.join("configs", "config_room1.yaml"))
+    parser.add_argument("--out", type=str, default=None, help="Results JSON (default: benchmarks/results/startup_<rev>.json).")
+    parser.add_argument("--compare", type=str, default=None, help="Baseline results JSON to compare against.")
+    args = parser.parse_args()
+
+    rows = []
+    print(f"{'command':<26} {'median_s':>9} {'min_s':>7} {'cv2':>4} {'numpy':>6}")
+    for name, argv in commands(args.config).items():
+        run_once(argv) # Warm the file system cache
+        times = [run_once(argv) for _ in range(args.repeats)]
+        modules = imported_modules(argv)
+        row = {"command": name, "median_s": statistics.median(times), "min_s": min(times),
+               "cv2": "cv2" in modules, "numpy": "numpy" in modules}
+        rows.append(row)
+        print(f"{name:<26} {row['median_s']:>9.3f} {row['min_s']:>7.3f} {'yes' if row['cv2'] else 'no':>4} {'yes' if row['numpy'] else 'no':>6}")
+
+    revision = git_revision()
+    results = {"revision": revision, "created": time.time(), "machine": platform.platform(),
+               "python": platform.python_version(), "repeats": args.repeats, "results": rows}
+    out = args.out or os.path.join(ROOT, "benchmarks", "results", f"startup_{revision}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = {r["command"]: r["median_s"] for r in json.load(f)["results"]}
+        print(f"\n{'command':<26} {'baseline_s':>10} {'current_s':>10} {'ratio':>7}")
+        for r in rows:
+            if r["command"] in baseline:
+                print(f"{r['command']:<26} {baseline[r['command']]:>10.3f} {r['median_s']:>10.3f} {r['median_s'] / baseline[r['command']]:>7.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Synthetic ROS-style occupancy grids (PGM + map_server YAML) for benchmarking.
+
+A map is a floor of rectangular rooms: straight walls on a jittered grid with door gaps,
+free space inside, unexplored (unknown) rectangles covering a chosen share of the floor,
+and salt-and-pepper sensor noise.
+
+    python benchmarks/synthetic_map.py out/warehouse --width-m 80 --height-m 60 --wall-density 0.3
+"""
+import argparse
+import os
+
+import cv2
+import numpy as np
+
+UNKNOWN_PGM_VAL = 205
+OCCUPIED_PGM_VAL = 0
+FREE_PGM_VAL = 254
+
+def generate_occupancy_grid(width_px, height_px, resolution=0.05, wall_density=0.25, noise=0.002,
+                            unknown_ratio=0.15, wall_thickness_px=2, door_width_m=0.9, diagonal_ratio=0.0, seed=0):
+    """
+    Builds a uint8 PGM-valued grid.
+
+    Args:
+        width_px, height_px: Map size in pixels.
+        resolution: Meters per pixel, used for wall spacing and door widths.
+        wall_density: Interior walls per meter along each axis.
+        noise: Fraction of free pixels flipped to occupied (and wall pixels dropped).
+        unknown_ratio: Target share of the floor left unknown (unexplored rectangles).
+        wall_thickness_px: Wall thickness in pixels.
+        door_width_m: Width of the gap left in each interior wall segment.
+        diagonal_ratio: Fraction of additional walls drawn at random angles.
+        seed: Random seed, the same arguments always give the same map.
+    """
+    rng = np.random.default_rng(seed)
+    grid = np.full((height_px, width_px), FREE_PGM_VAL, dtype=np.uint8)
+    door_px = max(2, int(door_width_m / resolution))
+
+    def wall_positions(extent_px):
+        count = int(extent_px * resolution * wall_density)
+        if count == 0: return []
+        base = np.linspace(0, extent_px, count + 2)[1:-1]
+        spacing = extent_px / (count + 1)
+        return np.clip(base + rng.uniform(-0.25, 0.25, count) * spacing, 1, extent_px - 2).astype(int)
+
+    xs, ys = wall_positions(width_px), wall_positions(height_px)
+    # Interior walls: each wall is split at the crossings, with one door per piece
+    for x in xs:
+        for y0, y1 in zip([0, *ys], [*ys, height_px - 1]):
+            cv2.line(grid, (int(x), int(y0)), (int(x), int(y1)), OCCUPIED_PGM_VAL, wall_thickness_px)
+            if y1 - y0 > 2 * door_px:
+                d = int(rng.integers(y0 + door_px // 2, y1 - door_px - door_px // 2))
+                grid[d:d + door_px, max(0, x - wall_thickness_px):x + wall_thickness_px + 1] = FREE_PGM_VAL
+    for y in ys:
+        for x0, x1 in zip([0, *xs], [*xs, width_px - 1]):
+            cv2.line(grid, (int(x0), int(y)), (int(x1), int(y)), OCCUPIED_PGM_VAL, wall_thickness_px)
+            if x1 - x0 > 2 * door_px:
+                d = int(rng.integers(x0 + door_px // 2, x1 - door_px - door_px // 2))
+                grid[max(0, y - wall_thickness_px):y + wall_thickness_px + 1, d:d + door_px] = FREE_PGM_VAL
+
+    num_diagonal = int(diagonal_ratio * (len(xs) + len(ys)))
+    for _ in range(num_diagonal):
+        p0 = rng.integers(0, [width_px, height_px])
+        length = rng.uniform(0.1, 0.4) * min(width_px, height_px)
+        angle = rng.uniform(0, np.pi)
+        p1 = (p0 + length * np.array([np.cos(angle), np.sin(angle)])).astype(int)
+        cv2.line(grid, (int(p0[0]), int(p0[1])), (int(p1[0]), int(p1[1])), OCCUPIED_PGM_VAL, wall_thickness_px)
+
+    # Outer boundary
+    cv2.rectangle(grid, (0, 0), (width_px - 1, height_px - 1), OCCUPIED_PGM_VAL, wall_thickness_px)
+
+    # Unexplored areas
+    target_unknown = unknown_ratio * grid.size
+    unknown = np.zeros(grid.shape, dtype=bool)
+    while unknown.sum() < target_unknown:
+        w = int(rng.uniform(0.05, 0.3) * width_px) + 1
+        h = int(rng.uniform(0.05, 0.3) * height_px) + 1
+        x0, y0 = int(rng.integers(0, width_px - w + 1)), int(rng.integers(0, height_px - h + 1))
+        unknown[y0:y0 + h, x0:x0 + w] = True
+    grid[unknown] = UNKNOWN_PGM_VAL
+
+    # Sensor noise: speckles in free space and dropouts in walls
+    if noise > 0:
+        flips = rng.random(grid.shape) < noise
+        free, occupied = grid == FREE_PGM_VAL, grid == OCCUPIED_PGM_VAL
+        grid[flips & free] = OCCUPIED_PGM_VAL
+        grid[flips & occupied] = FREE_PGM_VAL
+    return grid
+
+def write_map(path_prefix, grid, resolution=0.05, origin=(0.0, 0.0, 0.0), negate=0):
+    """Writes <prefix>.pgm and <prefix>.yaml in map_server format. Returns the YAML path."""
+    directory = os.path.dirname(os.path.abspath(path_prefix))
+    os.makedirs(directory, exist_ok=True)
+    pgm_path, yaml_path = path_prefix + ".pgm", path_prefix + ".yaml"
+    cv2.imwrite(pgm_path, grid)
+    with open(yaml_path, 'w') as f:
+        f.write(f"image: {os.path.basename(pgm_path)}\n")
+        f.write("mode: trinary\n")
+        f.write(f"resolution: {resolution}\n")
+        f.write(f"origin: [{origin[0]}, {origin[1]}, {origin[2]}]\n")
+        f.write(f"negate: {negate}\n")
+        f.write("occupied_thresh: 0.65\n")
+        f.write("free_thresh: 0.25\n")
+    return yaml_path
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic ROS-style occupancy grid.")
+    parser.add_argument("prefix", help="Output path without extension (writes .pgm and .yaml).")
+    parser.add_argument("--width-m", type=float, default=40.0)
+    parser.add_argument("--height-m", type=float, default=30.0)
+    parser.add_argument("--resolution", type=float, default=0.05)
+    parser.add_argument("--wall-density", type=float, default=0.25)
+    parser.add_argument("--noise", type=float, default=0.002)
+    parser.add_argument("--unknown-ratio", type=float, default=0.15)
+    parser.add_argument("--diagonal-ratio", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    grid = generate_occupancy_grid(int(args.width_m / args.resolution), int(args.height_m / args.resolution),
+                                   resolution=args.resolution, wall_density=args.wall_density, noise=args.noise,
+                                   unknown_ratio=args.unknown_ratio, diagonal_ratio=args.diagonal_ratio, seed=args.seed)
+    print(f"Wrote {write_map(args.prefix, grid, args.resolution)} ({grid.shape[1]}x{grid.shape[0]} px)")
+
+if __name__ == "__main__":
+    main()
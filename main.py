@@ -1,11 +1,12 @@
-import cv2
-import numpy as np
 import argparse
 import yaml
 import os
-from utils.utils import load_yaml_metadata, load_map, draw_debug_lines, draw_raster_floorplan, save_svg_floorplan
-from utils.wall_detection import detect_raw_lines, merge_lines
-from utils.preprocess import preprocess_map, clean_map
+import sys
+import functools
+from utils.mapfile import load_yaml_metadata, check_map_yaml
+from utils.profiling import StageProfiler, append_report
+# OpenCV, NumPy and the pipeline stages are imported inside the functions that use them, so
+# importing this module, --help and --validate-only do not pay for (or need) OpenCV
 
 # --- Parameters ---
 # --- Default values (used if YAML loading fails) ---
@@ -39,6 +40,35 @@ HOUGH_THRESHOLD = 30 # Lower threshold might detect more segments for merging
 MERGE_ANGLE_THRESHOLD_DEG = 10.0  # Max angle difference to consider lines collinear
 # Max distance between endpoints of segments to consider merging (pixels)
 MERGE_DISTANCE_THRESHOLD_PX = 18
+# Merged segment endpoints: "farthest" (farthest endpoint pair) or "pca" (principal-direction projection)
+MERGE_EXTENT_METHOD = "farthest"
+# Manhattan merge: snap segments within MANHATTAN_SNAP_DEG of the dominant orientation (or its
+# perpendicular) to it and merge them as 1-D intervals; other segments use the general merge
+MANHATTAN_MERGE = False
+MANHATTAN_SNAP_DEG = 2.0
+
+# Tiled processing: 0 processes the whole map at once; > 0 memory-maps the PGM and runs
+# preprocessing, cleaning and Hough per tile of this many pixels (debug images are skipped)
+TILE_SIZE_PX = 0
+# Extra overlap around each tile beyond the morphology margin: Hough sees more of the walls
+# that cross the tile, so fewer short walls fall below the vote threshold
+TILE_OVERLAP_PX = 128
+
+# Coarse-to-fine detection: 0 runs Hough at full resolution; n > 0 runs it on a 2**n times
+# smaller copy and refines the candidates at full resolution (for high-resolution maps)
+PYRAMID_LEVELS = 0
+
+# Per-component merge: 0 merges the raw segments of the whole map at once; n > 0 splits the map into
+# clusters of walls that cannot interact and merges each cluster on n processes (Hough runs on the whole map)
+COMPONENT_WORKERS = 0
+
+# Stage cache: directory for cached binary/cleaned maps and raw lines ("" disables it)
+CACHE_DIR = ""
+CACHE_MAX_MB = 1024
+
+# Incremental mode: keep the grid and walls of the last run next to the outputs and only
+# re-detect and re-merge the regions that changed (debug images are skipped)
+INCREMENTAL = False
 
 # Output drawing colors (BGR) / SVG Styles
 WALL_COLOR_BGR = (255,255,255)       
@@ -46,13 +76,21 @@ BACKGROUND_COLOR_BGR = (66, 55, 20)
 WALL_THICKNESS_PX = 2
 SVG_WALL_COLOR = "black"
 SVG_STROKE_WIDTH = "2"
+SVG_SINGLE_PATH = False # Write all walls as one <path> instead of one <line> each
+# The four debug PNGs (preprocessed, cleaned, raw and merged lines); encoding them is slow on large maps
+WRITE_DEBUG_IMAGES = True
 
 def load_config(config_file):
     """Loads configuration parameters from a YAML file."""
+    if config_file is None: return {}
     try:
         with open(config_file, 'r') as f:
             config = yaml.safe_load(f)
-            return config
+        if config is None: return {} # Empty file
+        if not isinstance(config, dict):
+            print(f"Error: configuration file '{config_file}' is not a mapping. Using default values.")
+            return {}
+        return config
     except FileNotFoundError:
         print(f"Warning: Configuration file '{config_file}' not found. Using default values.")
         return {}
@@ -60,8 +98,8 @@ def load_config(config_file):
         print(f"Error parsing YAML file '{config_file}': {e}. Using default values.")
         return {}
 
-def parse_arguments():
-    """Parses command line arguments."""
+def parse_arguments(argv=None):
+    """Parses command line arguments (sys.argv[1:] if argv is None)."""
     parser = argparse.ArgumentParser(description="Process floorplan data.")
     parser.add_argument(
         "--config",
@@ -69,22 +107,88 @@ def parse_arguments():
         default="config.yaml",
         help="Path to the configuration YAML file.",
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "--validate-only",
+        action="store_true",
+        help="Check the config, the map YAML and the map image header without running the pipeline (does not load OpenCV).",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Bypass the stage cache even if CACHE_DIR is configured.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Reuse the previous run's walls and only re-vectorize regions of the map that changed.",
+    )
+    parser.add_argument(
+        "--component-workers",
+        type=int,
+        default=None,
+        help="Merge walls per connected component on this many processes (0 disables).",
+    )
+    parser.add_argument(
+        "--no-debug-images",
+        action="store_true",
+        help="Skip the four debug PNGs (preprocessed, cleaned, raw and merged lines).",
+    )
+    parser.add_argument(
+        "--report",
+        type=str,
+        default=None,
+        help="Append a JSON line with per-stage time, CPU, memory and counts to this file.",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Also record tracemalloc peaks per stage (slower).",
+    )
+    parser.add_argument(
+        "--cprofile-stage",
+        type=str,
+        default=None,
+        help="Run this stage (e.g. merge, detect, write_svg) under cProfile.",
+    )
+    parser.add_argument(
+        "--cprofile-out",
+        type=str,
+        default=None,
+        help="Where to dump the cProfile stats (default: <stage>.prof).",
+    )
+    args = parser.parse_args(argv)
     return args
 
-def get_parameters(config_file="config.yaml"):
+def get_parameters(config_file="config.yaml", args=None):
     """
-    Loads parameters from a configuration file and command line arguments.
+    Loads parameters from a configuration file, with command line overrides.
+
+    Args:
+        config_file (str, optional): Path to the configuration YAML, used when args is None.
+        args (argparse.Namespace, optional): Parsed arguments; --config and the override
+                                             flags (--no-cache, --incremental, ...) apply.
+
+    Returns:
+        dict: A dictionary containing the loaded parameters.
+    """
+    if args is None: return load_parameters(config_file)
+    params = load_parameters(args.config)
+    if args.no_cache: params["CACHE_DIR"] = ""
+    if args.incremental: params["INCREMENTAL"] = True
+    if args.component_workers is not None: params["COMPONENT_WORKERS"] = args.component_workers
+    if args.no_debug_images: params["WRITE_DEBUG_IMAGES"] = False
+    return params
+
+def load_parameters(config_file="config.yaml"):
+    """
+    Loads parameters from a configuration file, falling back to the module defaults.
 
     Args:
         config_file (str, optional): Path to the YAML configuration file.
-                                     Defaults to "config.yaml".
 
     Returns:
         dict: A dictionary containing the loaded parameters.
     """
-    args = parse_arguments()
-    config_file = args.config
     config = load_config(config_file)
 
     params = {
@@ -95,6 +199,7 @@ def get_parameters(config_file="config.yaml"):
         "OUTPUT_CLEANED_FILE": config.get("OUTPUT_CLEANED_FILE", "debug_cleaned_room3.png"),
         "OUTPUT_RAW_LINES_FILE": config.get("OUTPUT_RAW_LINES_FILE", "debug_raw_lines_room3.png"),
         "OUTPUT_MERGED_LINES_FILE": config.get("OUTPUT_MERGED_LINES_FILE", "debug_merged_lines_room3.png"),
+        "OUTPUT_WALLS_FILE": config.get("OUTPUT_WALLS_FILE", ""),
         "DEFAULT_RESOLUTION": config.get("DEFAULT_RESOLUTION", DEFAULT_RESOLUTION),
         "DEFAULT_NEGATE": config.get("DEFAULT_NEGATE", DEFAULT_NEGATE),
         "DEFAULT_ORIGIN": config.get("DEFAULT_ORIGIN", DEFAULT_ORIGIN),
@@ -112,11 +217,23 @@ def get_parameters(config_file="config.yaml"):
         "HOUGH_THRESHOLD": config.get("HOUGH_THRESHOLD", HOUGH_THRESHOLD),
         "MERGE_ANGLE_THRESHOLD_DEG": config.get("MERGE_ANGLE_THRESHOLD_DEG", MERGE_ANGLE_THRESHOLD_DEG),
         "MERGE_DISTANCE_THRESHOLD_PX": config.get("MERGE_DISTANCE_THRESHOLD_PX", MERGE_DISTANCE_THRESHOLD_PX),
+        "MERGE_EXTENT_METHOD": config.get("MERGE_EXTENT_METHOD", MERGE_EXTENT_METHOD),
+        "MANHATTAN_MERGE": config.get("MANHATTAN_MERGE", MANHATTAN_MERGE),
+        "MANHATTAN_SNAP_DEG": config.get("MANHATTAN_SNAP_DEG", MANHATTAN_SNAP_DEG),
+        "TILE_SIZE_PX": config.get("TILE_SIZE_PX", TILE_SIZE_PX),
+        "TILE_OVERLAP_PX": config.get("TILE_OVERLAP_PX", TILE_OVERLAP_PX),
+        "PYRAMID_LEVELS": config.get("PYRAMID_LEVELS", PYRAMID_LEVELS),
+        "COMPONENT_WORKERS": config.get("COMPONENT_WORKERS", COMPONENT_WORKERS),
+        "CACHE_DIR": config.get("CACHE_DIR", CACHE_DIR),
+        "CACHE_MAX_MB": config.get("CACHE_MAX_MB", CACHE_MAX_MB),
+        "INCREMENTAL": config.get("INCREMENTAL", INCREMENTAL),
         "WALL_COLOR_BGR": tuple(config.get("WALL_COLOR_BGR", WALL_COLOR_BGR)),
         "BACKGROUND_COLOR_BGR": tuple(config.get("BACKGROUND_COLOR_BGR", BACKGROUND_COLOR_BGR)),
         "WALL_THICKNESS_PX": config.get("WALL_THICKNESS_PX", WALL_THICKNESS_PX),
         "SVG_WALL_COLOR": config.get("SVG_WALL_COLOR", SVG_WALL_COLOR),
         "SVG_STROKE_WIDTH": config.get("SVG_STROKE_WIDTH", SVG_STROKE_WIDTH),
+        "SVG_SINGLE_PATH": config.get("SVG_SINGLE_PATH", SVG_SINGLE_PATH),
+        "WRITE_DEBUG_IMAGES": config.get("WRITE_DEBUG_IMAGES", WRITE_DEBUG_IMAGES),
     }
 
     if config.get("INPUT_YAML_FILE"):
@@ -124,67 +241,336 @@ def get_parameters(config_file="config.yaml"):
 
     return params
 
+# --- Validation ---
+# Ranges checked by validate_parameters (integers must also be whole numbers)
+POSITIVE_PARAMS = ("DEFAULT_RESOLUTION", "MIN_LINE_LENGTH_METERS", "HOUGH_RHO", "HOUGH_THETA", "HOUGH_THRESHOLD", "CACHE_MAX_MB", "WALL_THICKNESS_PX")
+NON_NEGATIVE_PARAMS = ("MAX_LINE_GAP_METERS", "MERGE_ANGLE_THRESHOLD_DEG", "MERGE_DISTANCE_THRESHOLD_PX", "MANHATTAN_SNAP_DEG",
+                       "TILE_SIZE_PX", "TILE_OVERLAP_PX", "PYRAMID_LEVELS", "COMPONENT_WORKERS")
+INTEGER_PARAMS = ("HOUGH_THRESHOLD", "WALL_THICKNESS_PX", "TILE_SIZE_PX", "TILE_OVERLAP_PX", "PYRAMID_LEVELS", "COMPONENT_WORKERS")
+MERGE_EXTENT_METHODS = ("farthest", "pca") # Keys of utils.wall_detection.EXTENT_METHODS
 
-# --- Main ---
-if __name__ == "__main__":
-    
-    # Get the parameters using the function
-    params = get_parameters()
-
-    # Print the loaded parameters to verify
-    # print("Loaded Parameters:")
-    # for key, value in params.items():
-    #     print(f"  {key}: {value}")
-        
-    # Load YAML Metadata
-    metadata = load_yaml_metadata(params.get("INPUT_YAML_FILE"),params)
-    if metadata['image'] is None: exit("Error: PGM image file path not found in YAML.")
-    pgm_file, resolution, negate = metadata['image'], metadata['resolution'], metadata['negate']
-    if resolution <= 0: exit(f"Error: Invalid resolution ({resolution})")
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
 
-    # Calculate Pixel Parameters
-    hough_min_line_length_px = max(1, int(MIN_LINE_LENGTH_METERS / resolution))
-    hough_max_line_gap_px = max(1, int(MAX_LINE_GAP_METERS / resolution))
+def validate_parameters(params, config=None):
+    """
+    Checks parameter types and ranges and the map YAML and image they point to, without
+    loading OpenCV, NumPy or the map itself.
+
+    Args:
+        params (dict): Parameters as returned by load_parameters().
+        config (dict, optional): The raw config file, to report keys load_parameters ignores.
+
+    Returns:
+        list: Problem descriptions, empty if the pipeline can run.
+    """
+    problems = [f"Unknown config key '{key}'" for key in sorted(set(config or {}) - set(params))]
+    for key in POSITIVE_PARAMS + NON_NEGATIVE_PARAMS:
+        value = params.get(key)
+        integer = key in INTEGER_PARAMS
+        if not _is_number(value) or (integer and value != int(value)):
+            problems.append(f"{key} must be {'an integer' if integer else 'a number'}, got {value!r}")
+        elif value < 0 or (value == 0 and key in POSITIVE_PARAMS):
+            problems.append(f"{key} must be {'positive' if key in POSITIVE_PARAMS else 'non-negative'}, got {value!r}")
+    for key in ("MORPH_OPEN_KERNEL_SIZE", "MORPH_CLOSE_KERNEL_SIZE"):
+        value = params.get(key)
+        if len(value) != 2 or not all(_is_number(v) and v == int(v) and v > 0 for v in value):
+            problems.append(f"{key} must be two positive integers, got {list(value)}")
+    for key in ("WALL_COLOR_BGR", "BACKGROUND_COLOR_BGR"):
+        value = params.get(key)
+        if len(value) != 3 or not all(_is_number(v) and 0 <= v <= 255 for v in value):
+            problems.append(f"{key} must be three values in 0-255, got {list(value)}")
+    if params.get("MERGE_EXTENT_METHOD") not in MERGE_EXTENT_METHODS:
+        problems.append(f"MERGE_EXTENT_METHOD must be one of {list(MERGE_EXTENT_METHODS)}, got {params.get('MERGE_EXTENT_METHOD')!r}")
+    return problems + check_map_yaml(params.get("INPUT_YAML_FILE"))
+
+def validate_config(config_file):
+    """Loads a pipeline config and checks it with validate_parameters. Returns the problems."""
+    if not config_file or not os.path.isfile(config_file): return [f"Config file not found: {config_file}"]
+    try:
+        with open(config_file, 'r') as f: config = yaml.safe_load(f) or {}
+    except yaml.YAMLError as e:
+        return [f"Config {config_file} does not parse: {e}"]
+    if not isinstance(config, dict): return [f"Config {config_file} is not a mapping"]
+    try:
+        params = load_parameters(config_file)
+    except (TypeError, ValueError) as e: # e.g. a scalar where a kernel size or color list is expected
+        return [f"Config {config_file}: {e}"]
+    return validate_parameters(params, config)
+
+
+class PipelineError(Exception):
+    """Raised when a map cannot be turned into a floor plan."""
+
+def stage_params(params, keys):
+    return {k: params.get(k) for k in keys}
+
+def open_stage_cache(params):
+    """Returns a StageCache for params["CACHE_DIR"], or None when caching is disabled."""
+    if not params.get("CACHE_DIR"): return None
+    from utils.cache import StageCache
+    return StageCache(params.get("CACHE_DIR"), int(params.get("CACHE_MAX_MB") * 1024 * 1024))
+
+def pixel_parameters(resolution, params):
+    """
+    Converts the meter-based parameters to pixels for a map resolution.
+
+    Returns:
+        tuple: (hough_min_line_length_px, hough_max_line_gap_px, merge_dist_thresh_px)
+    """
+    hough_min_line_length_px = max(1, int(params.get("MIN_LINE_LENGTH_METERS") / resolution))
+    hough_max_line_gap_px = max(1, int(params.get("MAX_LINE_GAP_METERS") / resolution))
     # Merge distance threshold is in pixel value
-    merge_dist_thresh_px = MERGE_DISTANCE_THRESHOLD_PX
+    merge_dist_thresh_px = params.get("MERGE_DISTANCE_THRESHOLD_PX")
     print("Pixel parameters calculated:")
     print(f"  Hough Min Line Length: {hough_min_line_length_px} px")
     print(f"  Hough Max Line Gap: {hough_max_line_gap_px} px")
-    print(f"  Line Merge Angle Thresh: {MERGE_ANGLE_THRESHOLD_DEG} deg")
+    print(f"  Line Merge Angle Thresh: {params.get('MERGE_ANGLE_THRESHOLD_DEG')} deg")
     print(f"  Line Merge Distance Thresh: {merge_dist_thresh_px} px")
+    print(f"  Line Merge Extent Method: {params.get('MERGE_EXTENT_METHOD')}")
+    if params.get("MANHATTAN_MERGE"): print(f"  Manhattan Merge Snap: {params.get('MANHATTAN_SNAP_DEG')} deg")
+    if params.get("COMPONENT_WORKERS"): print(f"  Component Workers: {params.get('COMPONENT_WORKERS')}")
+    return hough_min_line_length_px, hough_max_line_gap_px, merge_dist_thresh_px
 
-    print("--- Starting Floor Plan Generation Pipeline ---")
-    # Load PGM Map
-    print(pgm_file)
-    original_map = load_map(pgm_file)
-    if original_map is None: exit()
-    map_shape = original_map.shape
+def component_partition(cleaned_occupancy, hough_max_line_gap_px, merge_dist_thresh_px, params):
+    """Clusters of the cleaned map for the per-component merge, or None if COMPONENT_WORKERS is 0."""
+    if not params.get("COMPONENT_WORKERS"): return None
+    from utils.components import ComponentPartition, component_separation_px
+    return ComponentPartition(cleaned_occupancy, component_separation_px(hough_max_line_gap_px, merge_dist_thresh_px))
 
-    # Preprocess Map -> Binary (0=Occupied, 255=Free)
-    binary_map = preprocess_map(original_map, negate,params)
-    if binary_map is None: exit("Preprocessing failed.")
+def detect_walls(cleaned_occupancy, hough_min_line_length_px, hough_max_line_gap_px, merge_dist_thresh_px, params):
+    """Hough detection at full resolution, or coarse-to-fine when PYRAMID_LEVELS > 0."""
+    from utils.wall_detection import detect_raw_lines_occupancy
+    from utils.pyramid import detect_raw_lines_pyramid
+    levels = params.get("PYRAMID_LEVELS") or 0
+    if levels > 0:
+        return detect_raw_lines_pyramid(cleaned_occupancy, hough_min_line_length_px, hough_max_line_gap_px, params,
+                                        levels, params.get("MERGE_ANGLE_THRESHOLD_DEG"), merge_dist_thresh_px)
+    return detect_raw_lines_occupancy(cleaned_occupancy, hough_min_line_length_px, hough_max_line_gap_px, params)
 
-    # Clean Binary Map (Morphological Ops)
-    cleaned_map = clean_map(binary_map,params)
-    if cleaned_map is None: exit("Cleaning failed.")
+def merge_walls(raw_lines, merge_dist_thresh_px, params, partition=None):
+    """
+    General indexed merge, or the Manhattan fast path when MANHATTAN_MERGE is set.
+    With a ComponentPartition the merge runs per component on COMPONENT_WORKERS processes.
+    """
+    from utils.wall_detection import merge_lines_indexed
+    from utils.manhattan import merge_lines_manhattan
+    from utils.components import merge_lines_components
+    if partition is not None:
+        merge_fn = functools.partial(merge_walls, merge_dist_thresh_px=merge_dist_thresh_px, params=params)
+        return merge_lines_components(raw_lines, partition, merge_fn, params.get("COMPONENT_WORKERS"))
+    if params.get("MANHATTAN_MERGE"):
+        return merge_lines_manhattan(raw_lines, params.get("MERGE_ANGLE_THRESHOLD_DEG"), merge_dist_thresh_px, params.get("MERGE_EXTENT_METHOD"),
+                                     params.get("MANHATTAN_SNAP_DEG"))
+    return merge_lines_indexed(raw_lines, params.get("MERGE_ANGLE_THRESHOLD_DEG"), merge_dist_thresh_px, params.get("MERGE_EXTENT_METHOD"))
 
-    # Detect Raw Line Segments (Hough)
-    raw_lines = detect_raw_lines(cleaned_map, hough_min_line_length_px, hough_max_line_gap_px,params)
+def vectorize_map(original_map, negate, resolution, params):
+    """
+    In-memory binarize/clean -> Hough -> merge for an already loaded occupancy grid,
+    without metadata files, caching or output writers.
 
-    # Merge Collinear/Close Line Segments
-    merged_wall_lines = merge_lines(raw_lines, MERGE_ANGLE_THRESHOLD_DEG, merge_dist_thresh_px)
+    Returns:
+        tuple: (cleaned_occupancy, raw_lines, merged_wall_lines)
+    """
+    from utils.preprocess import binarize_and_clean
+    if resolution <= 0: raise PipelineError(f"Invalid resolution ({resolution})")
+    hough_min_line_length_px, hough_max_line_gap_px, merge_dist_thresh_px = pixel_parameters(resolution, params)
+    _, cleaned_occupancy = binarize_and_clean(original_map, negate, params)
+    partition = component_partition(cleaned_occupancy, hough_max_line_gap_px, merge_dist_thresh_px, params)
+    raw_lines = detect_walls(cleaned_occupancy, hough_min_line_length_px, hough_max_line_gap_px, merge_dist_thresh_px, params)
+    merged_wall_lines = merge_walls(raw_lines, merge_dist_thresh_px, params, partition)
+    return cleaned_occupancy, raw_lines, merged_wall_lines
+
+def output_path(output_dir, params, key):
+    return os.path.join(output_dir, os.path.basename(params.get(key)))
+
+def run_pipeline(params, profiler=None):
+    """
+    Runs load -> binarize/clean -> Hough -> merge -> writers for one map.
+
+    Args:
+        params (dict): Parameters as returned by load_parameters().
+        profiler (StageProfiler, optional): Records per-stage time, memory and counts.
+                                            A fresh one is created if omitted.
+
+    Returns:
+        dict: Summary with the map name, output directory, segment counts,
+              per-stage wall times in seconds and the full profiler report.
+
+    Raises:
+        PipelineError: If the map metadata or image cannot be used.
+    """
+    import cv2
+    import numpy as np
+    from utils.utils import load_map, draw_debug_lines, draw_raster_floorplan, save_svg_floorplan
+    from utils.wall_detection import HOUGH_PARAMS
+    from utils.preprocess import binarize_and_clean, PREPROCESS_PARAMS, CLEAN_PARAMS
+    from utils.cache import file_digest
+    from utils.tiling import open_map_memmap, detect_raw_lines_tiled
+    from utils.incremental import vectorize_incremental
+    from utils.segments import WallSegments
+    prof = profiler or StageProfiler(run_name=params.get("INPUT_YAML_FILE"))
+
+    # Load YAML Metadata
+    with prof.stage("metadata"):
+        metadata = load_yaml_metadata(params.get("INPUT_YAML_FILE"),params)
+    if metadata['image'] is None: raise PipelineError("PGM image file path not found in YAML.")
+    pgm_file, resolution, negate = metadata['image'], metadata['resolution'], metadata['negate']
+    if resolution <= 0: raise PipelineError(f"Invalid resolution ({resolution})")
+
+    # Calculate Pixel Parameters
+    hough_min_line_length_px, hough_max_line_gap_px, merge_dist_thresh_px = pixel_parameters(resolution, params)
+
+    print("--- Starting Floor Plan Generation Pipeline ---")
+    tile_size = params.get("TILE_SIZE_PX") or 0
+    incremental = bool(params.get("INCREMENTAL"))
+    hough_args = dict(stage_params(params, HOUGH_PARAMS), min_line_length_px=hough_min_line_length_px, max_line_gap_px=hough_max_line_gap_px)
+    print(pgm_file)
+    if not os.path.exists(pgm_file): raise PipelineError(f"Could not load map image: {pgm_file}")
 
     # Create output directory
     config_filename = os.path.splitext(os.path.basename(params.get("INPUT_YAML_FILE")))[0]
     output_dir = os.path.join("output", config_filename)
     os.makedirs(output_dir, exist_ok=True)
 
-    # Save images with output directory
-    cv2.imwrite(os.path.join(output_dir, os.path.basename(params.get("OUTPUT_PREPROCESSED_FILE"))), binary_map)
-    cv2.imwrite(os.path.join(output_dir, os.path.basename(params.get("OUTPUT_CLEANED_FILE"))), cleaned_map)
-    draw_debug_lines(map_shape, raw_lines, (0,0,255), os.path.join(output_dir, os.path.basename(params.get("OUTPUT_RAW_LINES_FILE"))), params, background_map=cleaned_map) # Draw raw lines in red
-    draw_debug_lines(map_shape, merged_wall_lines, (0,255,0), os.path.join(output_dir, os.path.basename(params.get("OUTPUT_MERGED_LINES_FILE"))), params, background_map=cleaned_map) # Draw merged lines in green
-    draw_raster_floorplan(map_shape, merged_wall_lines, os.path.join(output_dir, os.path.basename(params.get("OUTPUT_RASTER_FLOORPLAN_FILE"))),params)
-    save_svg_floorplan(map_shape, merged_wall_lines, os.path.join(output_dir, os.path.basename(params.get("OUTPUT_VECTOR_FLOORPLAN_FILE"))))
+    # Each key chains the upstream key with the parameters its stage reads
+    cache = open_stage_cache(params) if not incremental else None
+    if cache is not None:
+        with prof.stage("cache_key", input_bytes=os.path.getsize(pgm_file)):
+            occupancy_key = cache.key(file_digest(pgm_file), "occupancy", negate=negate, **stage_params(params, PREPROCESS_PARAMS))
+            cleaned_key = cache.key(occupancy_key, "cleaned_occupancy", **stage_params(params, CLEAN_PARAMS))
+            if tile_size > 0:
+                raw_key = cache.key(cleaned_key, "raw_lines_tiled", tile_size=tile_size, overlap=params.get("TILE_OVERLAP_PX"), **hough_args)
+            elif params.get("PYRAMID_LEVELS"):
+                raw_key = cache.key(cleaned_key, "raw_lines_pyramid", levels=params.get("PYRAMID_LEVELS"), merge_angle_deg=params.get("MERGE_ANGLE_THRESHOLD_DEG"),
+                                    merge_dist_px=merge_dist_thresh_px, **hough_args)
+            else:
+                raw_key = cache.key(cleaned_key, "raw_lines", **hough_args)
+    raw_lines = cache.load(raw_key, "raw_lines") if cache else None
+
+    merged_wall_lines = partition = None
+    if incremental:
+        # Re-vectorize only where the grid differs from the previous run's
+        occupancy_map = cleaned_occupancy = None
+        with prof.stage("load") as st:
+            original_map = load_map(pgm_file)
+            if original_map is None: raise PipelineError(f"Could not load map image: {pgm_file}")
+            map_shape = original_map.shape
+            st["pixels"] = original_map.size
+        with prof.stage("incremental", pixels=original_map.size) as st:
+            state_prefix = os.path.join(output_dir, f".incremental_{config_filename}")
+            raw_lines, merged_wall_lines, info = vectorize_incremental(
+                original_map, negate, resolution, metadata['origin'], params, hough_min_line_length_px, hough_max_line_gap_px,
+                params.get("MERGE_ANGLE_THRESHOLD_DEG"), merge_dist_thresh_px, params.get("MERGE_EXTENT_METHOD"), state_prefix)
+            st.update(info, raw_segments=len(raw_lines), merged_segments=len(merged_wall_lines))
+    elif tile_size > 0:
+        # Preprocess, clean and detect per tile; full-size intermediates are never built
+        occupancy_map = cleaned_occupancy = None
+        with prof.stage("load") as st:
+            try: original_map = open_map_memmap(pgm_file)
+            except ValueError as e: raise PipelineError(f"Could not load map image: {e}")
+            if original_map is None: raise PipelineError(f"Could not load map image: {pgm_file}")
+            map_shape = original_map.shape
+            st["pixels"] = original_map.size
+        with prof.stage("detect", tile_size=tile_size, cached=raw_lines is not None) as st:
+            if raw_lines is None:
+                raw_lines = detect_raw_lines_tiled(original_map, negate, params, hough_min_line_length_px, hough_max_line_gap_px, tile_size)
+                if cache: cache.store(raw_key, np.asarray(raw_lines, dtype=np.int32).reshape(-1, 1, 4))
+            st["raw_segments"] = len(raw_lines)
+    else:
+        # Load PGM Map (or its cached binarized/cleaned versions)
+        with prof.stage("load") as st:
+            occupancy_map = cache.load(occupancy_key, "occupancy") if cache else None
+            cleaned_occupancy = cache.load(cleaned_key, "cleaned_occupancy") if cache else None
+            original_map = None
+            if occupancy_map is None or cleaned_occupancy is None:
+                original_map = load_map(pgm_file)
+                if original_map is None: raise PipelineError(f"Could not load map image: {pgm_file}")
+            st["cached"] = original_map is None
+            st["pixels"] = cleaned_occupancy.size if original_map is None else original_map.size
+
+        # Binarize and clean in one pass -> occupancy (255=Occupied, 0=Free)
+        if original_map is not None:
+            with prof.stage("clean", pixels=original_map.size):
+                occupancy_map, cleaned_occupancy = binarize_and_clean(original_map, negate, params)
+                if cache:
+                    cache.store(occupancy_key, occupancy_map)
+                    cache.store(cleaned_key, cleaned_occupancy)
+        map_shape = cleaned_occupancy.shape
+
+        # Detect Raw Line Segments (Hough)
+        with prof.stage("detect", pixels=cleaned_occupancy.size, cached=raw_lines is not None) as st:
+            if raw_lines is None:
+                raw_lines = detect_walls(cleaned_occupancy, hough_min_line_length_px, hough_max_line_gap_px, merge_dist_thresh_px, params)
+                if cache: cache.store(raw_key, np.asarray(raw_lines, dtype=np.int32).reshape(-1, 1, 4))
+            st["raw_segments"] = len(raw_lines)
 
-    print("--- Pipeline Finished ---")
\ No newline at end of file
+        # Split into clusters of walls that cannot interact (the merge runs per cluster)
+        if params.get("COMPONENT_WORKERS"):
+            with prof.stage("components", pixels=cleaned_occupancy.size) as st:
+                partition = component_partition(cleaned_occupancy, hough_max_line_gap_px, merge_dist_thresh_px, params)
+                st["components"] = partition.count
+    if cache: print(f"Stage cache: hits {cache.hits}, misses {cache.misses}")
+
+    # Merge Collinear/Close Line Segments
+    if merged_wall_lines is None:
+        with prof.stage("merge", raw_segments=len(raw_lines)) as st:
+            merged_wall_lines = merge_walls(raw_lines, merge_dist_thresh_px, params, partition)
+            st["merged_segments"] = len(merged_wall_lines)
+    walls = WallSegments.from_lines(merged_wall_lines, resolution=resolution, origin=metadata['origin'], map_shape=map_shape)
+
+    # Save images with output directory (debug images need the full-size intermediates)
+    if cleaned_occupancy is not None and params.get("WRITE_DEBUG_IMAGES"):
+        with prof.stage("write_debug", images=4, segments=len(raw_lines) + len(merged_wall_lines)):
+            # Debug images keep the original polarity (0=Occupied, 255=Free)
+            binary_map = cv2.bitwise_not(occupancy_map)
+            cleaned_map = cv2.bitwise_not(cleaned_occupancy)
+            cv2.imwrite(output_path(output_dir, params, "OUTPUT_PREPROCESSED_FILE"), binary_map)
+            cv2.imwrite(output_path(output_dir, params, "OUTPUT_CLEANED_FILE"), cleaned_map)
+            draw_debug_lines(map_shape, raw_lines, (0,0,255), output_path(output_dir, params, "OUTPUT_RAW_LINES_FILE"), params, background_map=cleaned_map) # Draw raw lines in red
+            draw_debug_lines(map_shape, walls.endpoints, (0,255,0), output_path(output_dir, params, "OUTPUT_MERGED_LINES_FILE"), params, background_map=cleaned_map) # Draw merged lines in green
+    with prof.stage("write_raster", segments=len(merged_wall_lines)):
+        draw_raster_floorplan(map_shape, walls.endpoints, output_path(output_dir, params, "OUTPUT_RASTER_FLOORPLAN_FILE"),params)
+    with prof.stage("write_svg", segments=len(merged_wall_lines)):
+        save_svg_floorplan(map_shape, walls.endpoints, output_path(output_dir, params, "OUTPUT_VECTOR_FLOORPLAN_FILE"), params)
+    if params.get("OUTPUT_WALLS_FILE"):
+        # Pixel endpoints plus resolution/origin, so consumers get world coordinates without parsing the SVG
+        with prof.stage("write_walls", segments=len(walls)):
+            walls.save(output_path(output_dir, params, "OUTPUT_WALLS_FILE"))
+
+    print("--- Pipeline Finished ---")
+    return {
+        "map": config_filename,
+        "output_dir": output_dir,
+        "shape": list(map_shape),
+        "raw_lines": len(raw_lines),
+        "merged_lines": len(merged_wall_lines),
+        "timings": prof.timings(),
+        "cache_hits": cache.hits if cache else [],
+        "profile": prof.report(map=config_filename, shape=list(map_shape)),
+    }
+
+
+# --- Main ---
+def main(argv=None):
+    """Command line entry point. Returns the process exit status."""
+    args = parse_arguments(argv)
+    if args.validate_only:
+        problems = validate_config(args.config)
+        print(f"{args.config}: {'OK' if not problems else f'{len(problems)} problem(s)'}")
+        for problem in problems: print(f"  {problem}")
+        return 1 if problems else 0
+
+    params = get_parameters(args=args)
+    profiler = StageProfiler(run_name=params.get("INPUT_YAML_FILE"), trace_memory=args.trace_memory,
+                             cprofile_stage=args.cprofile_stage, cprofile_path=args.cprofile_out)
+    try:
+        summary = run_pipeline(params, profiler)
+    except PipelineError as e:
+        if args.report: append_report(args.report, profiler.report(error=str(e)))
+        sys.exit(f"Error: {e}")
+    if args.report: append_report(args.report, summary["profile"])
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import cv2
+import numpy as np
+
+from main import load_parameters, vectorize_map, PipelineError
+from utils.utils import render_raster_floorplan, render_svg_floorplan
+from utils.segments import WallSegments
+
+CONTENT_TYPES = {"json": "application/json", "svg": "image/svg+xml", "png": "image/png"}
+RAW_CONTENT_TYPE = "application/octet-stream"
+
+def parse_arguments():
+    """Parses command line arguments."""
+    parser = argparse.ArgumentParser(description="Serve floor plan generation over a local HTTP API.")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Interface to bind (local only by default).")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--config", type=str, default=None, help="Configuration YAML with the pipeline parameters.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Warm worker processes.")
+    parser.add_argument("--max-queue", type=int, default=16, help="Requests allowed to wait for a worker before answering 503.")
+    parser.add_argument("--max-body-mb", type=float, default=256, help="Largest accepted request body.")
+    parser.add_argument("--request-timeout", type=float, default=120, help="Seconds before a request answers 504.")
+    parser.add_argument("--verbose", action="store_true", help="Log requests and pipeline output.")
+    return parser.parse_args()
+
+# --- Worker side ---
+
+_worker_params = None
+_worker_verbose = False
+
+def init_worker(params, verbose):
+    """Imports and warms up the pipeline once per worker process."""
+    global _worker_params, _worker_verbose
+    _worker_params, _worker_verbose = params, verbose
+    cv2.setNumThreads(1)
+    warmup = np.full((64, 64), params.get("FREE_PGM_VAL"), dtype=np.uint8)
+    warmup[32, 8:56] = params.get("OCCUPIED_PGM_VAL")
+    with contextlib.redirect_stdout(io.StringIO()):
+        vectorize_map(warmup, 0, params.get("DEFAULT_RESOLUTION"), params)
+
+def worker_ready(hold_s):
+    # Holding briefly makes each startup task land on a different worker
+    time.sleep(hold_s)
+    return os.getpid()
+
+def decode_grid(body, content_type, query):
+    """Decodes PGM/PNG bytes, or a raw uint8 array when width and height are given."""
+    if content_type == RAW_CONTENT_TYPE:
+        width, height = int(query["width"]), int(query["height"])
+        if len(body) != width * height: raise ValueError(f"Raw body has {len(body)} bytes, expected {width}x{height}")
+        return np.frombuffer(body, dtype=np.uint8).reshape(height, width)
+    grid = cv2.imdecode(np.frombuffer(body, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+    if grid is None: raise ValueError("Body is not a decodable PGM/PNG image")
+    if grid.ndim != 2: raise ValueError(f"Expected a single-channel occupancy grid, got shape {grid.shape}")
+    return grid
+
+def parse_origin(text):
+    """Parses an "x,y" or "x,y,theta" query value (map origin, as in the map YAML)."""
+    try:
+        origin = [float(v) for v in text.split(",")]
+    except ValueError:
+        raise ValueError(f"origin must be 2 or 3 comma-separated numbers, got '{text}'") from None
+    if len(origin) not in (2, 3) or not all(math.isfinite(v) for v in origin):
+        raise ValueError(f"origin must be 2 or 3 comma-separated numbers, got '{text}'")
+    return origin
+
+def handle_request(body, content_type, query):
+    """Runs the pipeline for one request. Returns (status, content_type, payload bytes)."""
+    start = time.perf_counter()
+    params = _worker_params
+    fmt = query.get("format", "json")
+    try:
+        if fmt not in CONTENT_TYPES: raise ValueError(f"Unknown format '{fmt}', expected one of {sorted(CONTENT_TYPES)}")
+        resolution = float(query.get("resolution", params.get("DEFAULT_RESOLUTION")))
+        negate = int(query.get("negate", params.get("DEFAULT_NEGATE")))
+        origin = parse_origin(query["origin"]) if "origin" in query else params.get("DEFAULT_ORIGIN")
+        grid = decode_grid(body, content_type, query)
+        with contextlib.redirect_stdout(sys.stdout if _worker_verbose else io.StringIO()):
+            _, raw_lines, merged_wall_lines = vectorize_map(grid, negate, resolution, params)
+            if fmt == "svg":
+                payload = render_svg_floorplan(grid.shape, merged_wall_lines, params).encode()
+            elif fmt == "png":
+                payload = cv2.imencode(".png", render_raster_floorplan(grid.shape, merged_wall_lines, params))[1].tobytes()
+    except (ValueError, KeyError, PipelineError) as e:
+        return 400, CONTENT_TYPES["json"], json.dumps({"error": f"{type(e).__name__}: {e}"}).encode()
+
+    if fmt == "json":
+        walls = WallSegments.from_lines(merged_wall_lines, resolution=resolution, origin=origin, map_shape=grid.shape)
+        payload = json.dumps({
+            "shape": list(grid.shape),
+            "resolution": resolution,
+            "origin": origin,
+            "negate": negate,
+            "raw_segments": len(raw_lines),
+            "segments": walls.endpoints.tolist(),
+            "world_segments": walls.world_endpoints().round(4).tolist(),
+            "seconds": time.perf_counter() - start,
+        }).encode()
+    return 200, CONTENT_TYPES[fmt], payload
+
+# --- Server side ---
+
+class FloorPlanServer(ThreadingHTTPServer):
+    """HTTP server that hands requests to a warm process pool through a bounded queue."""
+    daemon_threads = True
+
+    def __init__(self, address, params, args):
+        super().__init__(address, FloorPlanHandler)
+        self.args = args
+        self.params = params
+        self.max_body = int(args.max_body_mb * 1024 * 1024)
+        # In-flight plus waiting requests; anything beyond is rejected instead of queued
+        self.capacity = args.workers + args.max_queue
+        self.slots = threading.BoundedSemaphore(self.capacity)
+        self.pool_lock = threading.Lock()
+        self.pool = self.start_pool()
+
+    def start_pool(self):
+        pool = ProcessPoolExecutor(max_workers=self.args.workers, initializer=init_worker, initargs=(self.params, self.args.verbose))
+        pids = {f.result() for f in [pool.submit(worker_ready, 0.2) for _ in range(self.args.workers)]}
+        print(f"{len(pids)} of {self.args.workers} workers warm.")
+        return pool
+
+    def restart_pool(self, broken):
+        """Replaces a pool that lost a worker (a broken pool rejects every later task)."""
+        with self.pool_lock:
+            if self.pool is not broken: return # Another request already replaced it
+            print("Worker pool is broken, starting a new one.")
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.pool = self.start_pool()
+
+    def submit(self, fn, *args):
+        """Submits to the current pool, replacing it first if it is broken. Returns (pool, future)."""
+        pool = self.pool
+        try:
+            return pool, pool.submit(fn, *args)
+        except BrokenProcessPool:
+            self.restart_pool(pool)
+            pool = self.pool
+            return pool, pool.submit(fn, *args)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(cancel_futures=True)
+
+class FloorPlanHandler(BaseHTTPRequestHandler):
+    server_version = "FloorPlanServer/1.0"
+
+    def send_payload(self, status, content_type, payload, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items(): self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_json(self, status, obj, headers=None):
+        self.send_payload(status, CONTENT_TYPES["json"], json.dumps(obj).encode(), headers)
+
+    def do_GET(self):
+        if urlparse(self.path).path != "/health":
+            return self.send_json(404, {"error": "Not found"})
+        self.send_json(200, {"status": "ok", "workers": self.server.args.workers, "capacity": self.server.capacity})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/floorplan":
+            return self.send_json(404, {"error": "Not found"})
+        length = int(self.headers.get("Content-Length", 0))
+        if length <= 0:
+            return self.send_json(411, {"error": "Content-Length with a map body is required"})
+        if length > self.server.max_body:
+            self.close_connection = True
+            return self.send_json(413, {"error": f"Body larger than {self.server.max_body} bytes"})
+        if not self.server.slots.acquire(blocking=False):
+            self.close_connection = True
+            return self.send_json(503, {"error": "Request queue is full"}, {"Retry-After": "1"})
+        try:
+            body = self.rfile.read(length)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            content_type = self.headers.get("Content-Type", "").split(";")[0].strip()
+            pool, future = self.server.submit(handle_request, body, content_type, query)
+        except BaseException:
+            self.server.slots.release()
+            raise
+        # The slot is held until the task finishes, not until this request stops waiting:
+        # a timed-out task keeps its worker busy, so it must keep counting against the capacity
+        future.add_done_callback(lambda _: self.server.slots.release())
+        try:
+            status, content_type, payload = future.result(timeout=self.server.args.request_timeout)
+        except FutureTimeoutError:
+            future.cancel() # Only stops a task that has not started yet
+            return self.send_json(504, {"error": "Request timed out"})
+        except BrokenProcessPool:
+            self.server.restart_pool(pool)
+            return self.send_json(500, {"error": "Worker process died, request aborted"})
+        except Exception as e:
+            return self.send_json(500, {"error": f"{type(e).__name__}: {e}"})
+        self.send_payload(status, content_type, payload)
+
+    def log_message(self, format, *args):
+        if self.server.args.verbose: super().log_message(format, *args)
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    args.workers = max(1, args.workers)
+    with contextlib.redirect_stdout(io.StringIO()):
+        params = load_parameters(args.config)
+    server = FloorPlanServer((args.host, args.port), params, args)
+    print(f"Serving floor plans on http://{args.host}:{args.port} (POST /floorplan, GET /health)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,285 @@
+import argparse
+import contextlib
+import csv
+import io
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import cv2
+import numpy as np
+import yaml
+
+from main import load_parameters, pixel_parameters, detect_walls, merge_walls, validate_parameters
+from utils.utils import load_yaml_metadata, load_map
+from utils.preprocess import binarize_and_clean, PREPROCESS_PARAMS, CLEAN_PARAMS
+from utils.wall_detection import HOUGH_PARAMS
+from utils.segments import WallSegments
+
+# --- Parameter Sweep ---
+# Every combination of the grid runs clean -> detect -> merge, but each stage only depends on
+# the parameters it reads and on the stages before it. Combinations that agree on those share
+# one run of the stage: the grid becomes a tree with one clean node per distinct cleaning
+# setting, one detect node per distinct Hough setting below it and one merge node per
+# combination. Detect and merge nodes run on a process pool as soon as their parent is done.
+
+CLEAN_STAGE_PARAMS = PREPROCESS_PARAMS + CLEAN_PARAMS
+DETECT_STAGE_PARAMS = HOUGH_PARAMS + ("MIN_LINE_LENGTH_METERS", "MAX_LINE_GAP_METERS", "PYRAMID_LEVELS")
+MERGE_STAGE_PARAMS = ("MERGE_ANGLE_THRESHOLD_DEG", "MERGE_DISTANCE_THRESHOLD_PX", "MERGE_EXTENT_METHOD", "MANHATTAN_MERGE", "MANHATTAN_SNAP_DEG")
+SWEEPABLE_PARAMS = CLEAN_STAGE_PARAMS + DETECT_STAGE_PARAMS + MERGE_STAGE_PARAMS
+
+def parse_arguments():
+    """Parses command line arguments."""
+    parser = argparse.ArgumentParser(description="Run the pipeline for every combination of a parameter grid, sharing common stages.")
+    parser.add_argument(
+        "grid",
+        nargs="*",
+        help="Swept parameters as KEY=V1,V2,... (values are parsed as YAML, e.g. MORPH_OPEN_KERNEL_SIZE=[3,3],[5,5]).",
+    )
+    parser.add_argument(
+        "--grid-file",
+        type=str,
+        default=None,
+        help="YAML file mapping parameter names to lists of values (combined with the command line grid).",
+    )
+    parser.add_argument(
+        "--config",
+        type=str,
+        default="config.yaml",
+        help="Base configuration YAML (map and all parameters that are not swept).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of worker processes for detect and merge nodes (1 runs everything in this process).",
+    )
+    parser.add_argument(
+        "--opencv-threads",
+        type=int,
+        default=1,
+        help="OpenCV threads per worker (keep low to avoid oversubscribing the pool).",
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="Also report wall precision and recall against the cleaned map.",
+    )
+    parser.add_argument(
+        "--tolerance-px",
+        type=float,
+        default=2.0,
+        help="Distance in pixels within which a wall and an occupied pixel match (--metrics).",
+    )
+    parser.add_argument(
+        "--csv",
+        type=str,
+        default=None,
+        help="Optional path for the results table as CSV.",
+    )
+    parser.add_argument(
+        "--json",
+        type=str,
+        default=None,
+        help="Optional path for the results and sweep summary as JSON.",
+    )
+    return parser.parse_args()
+
+def parse_grid(items, grid_file=None):
+    """Builds {parameter: [values]} from KEY=V1,V2 items and an optional YAML grid file."""
+    grid = {}
+    if grid_file:
+        with open(grid_file, 'r') as f:
+            data = yaml.safe_load(f) or {}
+        grid.update({key: values if isinstance(values, list) else [values] for key, values in data.items()})
+    for item in items:
+        key, sep, values = item.partition("=")
+        if not sep or not values: raise ValueError(f"Expected KEY=V1,V2,... but got '{item}'")
+        grid[key.strip()] = yaml.safe_load(f"[{values}]")
+    unknown = [key for key in grid if key not in SWEEPABLE_PARAMS]
+    if unknown: raise ValueError(f"Cannot sweep {unknown}: only parameters read by clean, detect or merge can be swept ({', '.join(SWEEPABLE_PARAMS)})")
+    empty = [key for key, values in grid.items() if not values]
+    if empty: raise ValueError(f"No values to sweep for {empty}")
+    # Kernel sizes are tuples after load_parameters
+    return {key: [tuple(v) if isinstance(v, list) else v for v in values] for key, values in grid.items()}
+
+def stage_key(params, names):
+    return tuple((name, repr(params.get(name))) for name in names)
+
+def detect_stage_params(params):
+    # Coarse-to-fine detection merges its coarse candidates, so it also reads the merge thresholds
+    if params.get("PYRAMID_LEVELS"): return DETECT_STAGE_PARAMS + ("MERGE_ANGLE_THRESHOLD_DEG", "MERGE_DISTANCE_THRESHOLD_PX")
+    return DETECT_STAGE_PARAMS
+
+def build_dag(base_params, grid):
+    """
+    Expands the grid into combinations and the distinct stage runs they need.
+
+    Returns:
+        tuple: (combos, nodes). combos is a list of (swept values, clean key, detect key,
+               merge key); nodes maps "clean", "detect" and "merge" to {key: (params, parent key)}.
+               Keys chain the parent key with the stage's own parameters.
+    """
+    combos, nodes = [], {"clean": {}, "detect": {}, "merge": {}}
+    for values in itertools.product(*grid.values()):
+        combo = dict(zip(grid, values))
+        params = dict(base_params, **combo)
+        clean_key = stage_key(params, CLEAN_STAGE_PARAMS)
+        detect_key = clean_key + stage_key(params, detect_stage_params(params))
+        merge_key = detect_key + stage_key(params, MERGE_STAGE_PARAMS)
+        nodes["clean"].setdefault(clean_key, (params, None))
+        nodes["detect"].setdefault(detect_key, (params, clean_key))
+        nodes["merge"].setdefault(merge_key, (params, detect_key))
+        combos.append((combo, clean_key, detect_key, merge_key))
+    return combos, nodes
+
+def coverage_metrics(occupancy_img, walls, tolerance_px):
+    """
+    precision: share of drawn wall pixels within tolerance_px of an occupied pixel.
+    recall: share of occupied pixels within tolerance_px of a wall.
+    """
+    drawn = np.zeros(occupancy_img.shape[:2], dtype=np.uint8)
+    cv2.polylines(drawn, walls.endpoints.reshape(-1, 2, 2), False, 255, 1)
+    dist_to_wall = cv2.distanceTransform((drawn == 0).astype(np.uint8), cv2.DIST_L2, 3)
+    dist_to_occupied = cv2.distanceTransform((occupancy_img == 0).astype(np.uint8), cv2.DIST_L2, 3)
+    on_wall, occupied = drawn > 0, occupancy_img > 0
+    return {
+        "precision": float((dist_to_occupied[on_wall] <= tolerance_px).mean()) if on_wall.any() else 0.0,
+        "recall": float((dist_to_wall[occupied] <= tolerance_px).mean()) if occupied.any() else 0.0,
+    }
+
+# Cleaned maps by clean key: set once per worker process instead of pickled with every task
+_CLEANED = {}
+
+def init_worker(cleaned, opencv_threads):
+    cv2.setNumThreads(opencv_threads)
+    _CLEANED.update(cleaned)
+
+def run_detect(clean_key, params, resolution):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        min_px, gap_px, merge_dist = pixel_parameters(resolution, params)
+        raw_lines = detect_walls(_CLEANED[clean_key], min_px, gap_px, merge_dist, params)
+        seconds = time.perf_counter() - start
+    return np.asarray(raw_lines, dtype=np.int32).reshape(-1, 1, 4), seconds
+
+def run_merge(clean_key, raw_lines, params, resolution, tolerance_px):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        _, _, merge_dist = pixel_parameters(resolution, params)
+        merged = merge_walls(raw_lines, merge_dist, params)
+        seconds = time.perf_counter() - start
+    walls = WallSegments.from_lines(merged, resolution=resolution)
+    result = {"walls": len(walls), "merge_s": seconds, "wall_length_m": float(walls.world_lengths().sum())}
+    if tolerance_px is not None: result.update(coverage_metrics(_CLEANED[clean_key], walls, tolerance_px))
+    return result
+
+def run_sweep(original_map, negate, resolution, combos, nodes, workers, opencv_threads=1, tolerance_px=None):
+    """
+    Runs every node of the DAG once and assembles one result row per combination.
+    Returns (rows, seconds spent cleaning per clean key).
+    """
+    # Clean nodes are few (usually one) and their output is needed by every worker
+    cleaned, clean_seconds = {}, {}
+    for key, (params, _) in nodes["clean"].items():
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            cleaned[key] = binarize_and_clean(original_map, negate, params)[1]
+            clean_seconds[key] = time.perf_counter() - start
+
+    children = {}
+    for key, (_, parent) in nodes["merge"].items():
+        children.setdefault(parent, []).append(key)
+    detected, merged = {}, {}
+    def merge_args(key):
+        params, parent = nodes["merge"][key]
+        return nodes["detect"][parent][1], detected[parent][0], params, resolution, tolerance_px
+
+    if workers <= 1:
+        _CLEANED.update(cleaned)
+        for key, (params, parent) in nodes["detect"].items():
+            detected[key] = run_detect(parent, params, resolution)
+            for child in children[key]: merged[child] = run_merge(*merge_args(child))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(cleaned, opencv_threads)) as pool:
+            pending = {pool.submit(run_detect, parent, params, resolution): ("detect", key) for key, (params, parent) in nodes["detect"].items()}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, key = pending.pop(future)
+                    if stage == "merge":
+                        merged[key] = future.result()
+                        continue
+                    # Fan out the merges as soon as their raw lines are ready
+                    detected[key] = future.result()
+                    for child in children[key]:
+                        pending[pool.submit(run_merge, *merge_args(child))] = ("merge", child)
+
+    rows = []
+    for combo, clean_key, detect_key, merge_key in combos:
+        raw_lines, detect_s = detected[detect_key]
+        result = merged[merge_key]
+        row = dict(combo, raw=len(raw_lines), walls=result["walls"], wall_length_m=round(result["wall_length_m"], 2),
+                   clean_s=clean_seconds[clean_key], detect_s=detect_s, merge_s=result["merge_s"])
+        row["path_s"] = row["clean_s"] + row["detect_s"] + row["merge_s"]
+        if "precision" in result: row.update(precision=result["precision"], recall=result["recall"])
+        rows.append(row)
+    return rows, clean_seconds
+
+def print_table(rows, grid):
+    def fmt(value):
+        if isinstance(value, float): return f"{value:.3f}"
+        return str(list(value)) if isinstance(value, tuple) else str(value)
+    columns = list(grid) + [c for c in ("raw", "walls", "wall_length_m", "detect_s", "merge_s", "path_s", "precision", "recall") if c in rows[0]]
+    widths = [max(len(c), *(len(fmt(r[c])) for r in rows)) for c in columns]
+    header = " ".join(f"{c:>{w}}" for c, w in zip(columns, widths))
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        print(" ".join(f"{fmt(r[c]):>{w}}" for c, w in zip(columns, widths)))
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    try:
+        grid = parse_grid(args.grid, args.grid_file)
+    except (OSError, ValueError, yaml.YAMLError) as e:
+        exit(f"Error: {e}")
+    if not grid: exit("Error: no parameters to sweep (give KEY=V1,V2,... or --grid-file).")
+    with contextlib.redirect_stdout(io.StringIO()):
+        base_params = load_parameters(args.config)
+    # Everything runs in memory, one process per node
+    base_params.update(TILE_SIZE_PX=0, INCREMENTAL=False, COMPONENT_WORKERS=0, CACHE_DIR="")
+
+    combos, nodes = build_dag(base_params, grid)
+    problems = sorted({p for combo, *_ in combos for p in validate_parameters(dict(base_params, **combo))})
+    if problems: exit("Error: invalid parameters:\n  " + "\n  ".join(problems))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        metadata = load_yaml_metadata(base_params.get("INPUT_YAML_FILE"), base_params)
+        original_map = load_map(metadata['image'])
+    if original_map is None: exit(f"Error: could not load map image: {metadata['image']}")
+    print(f"Sweeping {len(combos)} combinations of {', '.join(grid)} on {metadata['image']} "
+          f"({len(nodes['clean'])} clean, {len(nodes['detect'])} detect, {len(nodes['merge'])} merge nodes, {args.workers} workers)...")
+
+    start = time.perf_counter()
+    rows, clean_seconds = run_sweep(original_map, metadata['negate'], metadata['resolution'], combos, nodes, max(1, args.workers),
+                                    args.opencv_threads, args.tolerance_px if args.metrics else None)
+    wall_seconds = time.perf_counter() - start
+    print_table(rows, grid)
+    # Without sharing, every combination would run all three stages
+    separate = sum(r["path_s"] for r in rows)
+    print(f"{len(rows)} combinations in {wall_seconds:.2f} s wall time: {sum(len(n) for n in nodes.values())} stage runs "
+          f"instead of {3 * len(rows)} ({separate:.2f} s of stage time when run one by one).")
+
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows({k: list(v) if isinstance(v, tuple) else v for k, v in r.items()} for r in rows)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"config": args.config, "grid": grid, "wall_seconds": wall_seconds, "nodes": {k: len(v) for k, v in nodes.items()},
+                       "results": rows}, f, indent=2)
@@ -0,0 +1,25 @@
+import contextlib
+import io
+import os
+import sys
+import pytest
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Tests import the pipeline modules the same way main.py does, from the repository root
+sys.path.insert(0, ROOT)
+
+@pytest.fixture
+def room():
+    """Loads a bundled map: room("room1") -> (params, metadata, original_map)."""
+    from main import load_parameters
+    from utils.utils import load_map
+    def load(name):
+        with contextlib.redirect_stdout(io.StringIO()):
+            params = load_parameters(os.path.join(ROOT, "configs", f"config_{name}.yaml"))
+            with open(os.path.join(ROOT, "metadata", f"{name}.yaml")) as f:
+                metadata = yaml.safe_load(f)
+            original_map = load_map(os.path.join(ROOT, "metadata", metadata["image"]))
+        return params, metadata, original_map
+    return load
@@ -0,0 +1,22 @@
+import contextlib
+import io
+import os
+from batch import run_batch, print_summary
+
+def fake_process(yaml_path, base_params):
+    if "crash" in yaml_path: os._exit(1) # Kills the worker like an OOM kill or segfault
+    return {"input": yaml_path, "status": "ok", "raw_lines": 1, "merged_lines": 1, "seconds": 0.0, "timings": {}}
+
+def test_dead_worker_fails_only_its_map():
+    paths = [f"map{i}.yaml" for i in range(6)] + ["crash.yaml"] + [f"map{i}.yaml" for i in range(6, 12)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = run_batch(paths, {}, 2, 1, process_fn=fake_process)
+    status = {r["input"]: r["status"] for r in results}
+    assert len(results) == len(paths)
+    assert status.pop("crash.yaml") == "failed"
+    assert set(status.values()) == {"ok"}
+
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        print_summary(sorted(results, key=lambda r: r["input"]), 0.0)
+    assert "13 maps, 12 ok, 1 failed" in out.getvalue()
@@ -0,0 +1,17 @@
+import contextlib
+import io
+import os
+from main import load_parameters, vectorize_map
+from utils.utils import load_map
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_component_merge_matches_whole_map():
+    with contextlib.redirect_stdout(io.StringIO()):
+        params = load_parameters(os.path.join(ROOT, "configs", "config_room1.yaml"))
+        original_map = load_map(os.path.join(ROOT, "metadata", "room1.pgm"))
+        _, raw, merged = vectorize_map(original_map, 0, 0.01, params)
+        _, component_raw, component_merged = vectorize_map(original_map, 0, 0.01, dict(params, COMPONENT_WORKERS=2))
+    # Hough runs on the whole map either way; only the merge is split by cluster
+    assert component_raw.tolist() == raw.tolist()
+    assert sorted(map(str, component_merged)) == sorted(map(str, merged))
@@ -0,0 +1,41 @@
+import contextlib
+import io
+import os
+import numpy as np
+from main import pixel_parameters
+from utils.incremental import vectorize_incremental
+
+def _run(grid, metadata, origin, params, prefix):
+    with contextlib.redirect_stdout(io.StringIO()):
+        min_px, gap_px, merge_dist = pixel_parameters(metadata["resolution"], params)
+        return vectorize_incremental(grid, metadata["negate"], metadata["resolution"], origin, params, min_px, gap_px,
+                                     params.get("MERGE_ANGLE_THRESHOLD_DEG"), merge_dist, params.get("MERGE_EXTENT_METHOD"), prefix)
+
+def test_unchanged_map_returns_previous_walls(room, tmp_path):
+    params, metadata, original_map = room("room2")
+    prefix = os.path.join(tmp_path, ".incremental_room2")
+    raw, walls, info = _run(original_map, metadata, metadata["origin"], params, prefix)
+    assert info["mode"] == "full" and len(walls)
+    again_raw, again_walls, again_info = _run(original_map.copy(), metadata, metadata["origin"], params, prefix)
+    assert again_info["mode"] == "incremental" and again_info["dirty_regions"] == 0
+    assert again_info["reused_walls"] == len(walls)
+    assert np.array_equal(again_raw, raw)
+    assert again_walls == walls
+
+def test_grown_map_shifts_previous_walls(room, tmp_path):
+    params, metadata, original_map = room("room2")
+    prefix = os.path.join(tmp_path, ".incremental_room2")
+    _, walls, _ = _run(original_map, metadata, metadata["origin"], params, prefix)
+    # 40 unknown columns on the left and 40 rows on top: the lower-left origin moves left only
+    grown = np.pad(original_map, ((40, 0), (40, 0)), constant_values=params.get("UNKNOWN_PGM_VAL"))
+    origin = [metadata["origin"][0] - 40 * metadata["resolution"], metadata["origin"][1], 0.0]
+    _, grown_walls, info = _run(grown, metadata, origin, params, prefix)
+    assert info["mode"] == "incremental" and info["dirty_regions"] == 0
+    assert grown_walls == [[[x1 + 40, y1 + 40, x2 + 40, y2 + 40]] for [[x1, y1, x2, y2]] in walls]
+
+def test_changed_parameters_force_full_run(room, tmp_path):
+    params, metadata, original_map = room("room2")
+    prefix = os.path.join(tmp_path, ".incremental_room2")
+    _run(original_map, metadata, metadata["origin"], params, prefix)
+    _, _, info = _run(original_map, metadata, metadata["origin"], dict(params, HOUGH_THRESHOLD=params.get("HOUGH_THRESHOLD") + 5), prefix)
+    assert info["mode"] == "full"
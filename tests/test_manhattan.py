@@ -0,0 +1,23 @@
+import contextlib
+import io
+from utils.manhattan import merge_lines_manhattan
+from utils.wall_detection import merge_lines_indexed
+
+def _merge(fn, lines):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return sorted(line[0] for line in fn(lines, 10.0, 18))
+
+def test_parallel_walls_are_not_chained_through_other_walls():
+    # y=100 and y=130 are 30 px apart; the wall at y=115 is 700 px away along x
+    lines = [[[0, 100, 300, 100]], [[0, 130, 300, 130]], [[1000, 115, 1300, 115]], [[0, 0, 0, 300]]]
+    assert _merge(merge_lines_manhattan, lines) == _merge(merge_lines_indexed, lines)
+
+def test_clutter_does_not_collapse_corridor():
+    lines = [[[0, 100, 600, 100]], [[0, 134, 600, 134]], [[200, 117, 230, 117]]]
+    merged = _merge(merge_lines_manhattan, lines)
+    assert len(merged) == 2
+    assert {y for _, y, _, _ in merged} >= {134}
+
+def test_endpoints_stay_within_the_raw_extent():
+    merged = _merge(merge_lines_manhattan, [[[0, 0, 100, 37]], [[5, 0, 105, 37]]])
+    assert all(0 <= x <= 105 and 0 <= y <= 37 for x1, y1, x2, y2 in merged for x, y in ((x1, y1), (x2, y2)))
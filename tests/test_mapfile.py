@@ -0,0 +1,34 @@
+import os
+import numpy as np
+import pytest
+from utils.mapfile import read_pgm_header, check_map_yaml
+from utils.tiling import open_map_memmap
+
+def _write(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+def test_header_with_long_comment(tmp_path):
+    raster = bytes(range(12))
+    comment = b"# " + b"x" * 10000 + b"\n"
+    path = _write(os.path.join(tmp_path, "map.pgm"), b"P5\n" + comment + b"4 # width\n3\n255\n" + raster)
+    width, height, maxval, offset = read_pgm_header(path)
+    assert (width, height, maxval) == (4, 3, 255)
+    assert offset == os.path.getsize(path) - len(raster)
+    assert np.array_equal(open_map_memmap(path), np.arange(12, dtype=np.uint8).reshape(3, 4))
+
+@pytest.mark.parametrize("data", [b"P5\n# comment without end", b"P5\n4 3", b"P5\n4 3 255", b"P5 4 x 255\n", b"P5\n0 3 255\n", b"P5\n4 3 70000\n"])
+def test_malformed_header(tmp_path, data):
+    path = _write(os.path.join(tmp_path, "map.pgm"), data)
+    with pytest.raises(ValueError, match="malformed PGM header"):
+        read_pgm_header(path)
+
+def test_not_a_binary_pgm(tmp_path):
+    assert read_pgm_header(_write(os.path.join(tmp_path, "map.pgm"), b"P2\n4 3\n255\n")) is None
+
+def test_check_map_yaml_reports_malformed_header(tmp_path):
+    _write(os.path.join(tmp_path, "map.pgm"), b"P5\n# " + b"x" * 5000)
+    yaml_path = _write(os.path.join(tmp_path, "map.yaml"), b"image: map.pgm\nresolution: 0.05\n")
+    problems = check_map_yaml(yaml_path)
+    assert len(problems) == 1 and "malformed PGM header" in problems[0]
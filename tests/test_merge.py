@@ -0,0 +1,53 @@
+import contextlib
+import io
+import numpy as np
+import pytest
+from main import pixel_parameters, detect_walls
+from utils.preprocess import binarize_and_clean
+from utils.wall_detection import merge_lines, merge_lines_indexed, group_lines_indexed, _segment_array
+from utils.wall_detection import _group_extents_farthest, _group_extents_pca
+
+def _raw_lines(room, name):
+    params, metadata, original_map = room(name)
+    with contextlib.redirect_stdout(io.StringIO()):
+        _, cleaned = binarize_and_clean(original_map, metadata["negate"], params)
+        min_px, gap_px, merge_dist = pixel_parameters(metadata["resolution"], params)
+        raw = detect_walls(cleaned, min_px, gap_px, merge_dist, params)
+    return params, raw, merge_dist
+
+@pytest.mark.parametrize("name", ["room1", "room2", "room3"])
+def test_indexed_merge_matches_merge_lines(room, name):
+    params, raw, merge_dist = _raw_lines(room, name)
+    with contextlib.redirect_stdout(io.StringIO()):
+        reference = merge_lines(raw, params.get("MERGE_ANGLE_THRESHOLD_DEG"), merge_dist)
+        indexed = merge_lines_indexed(raw, params.get("MERGE_ANGLE_THRESHOLD_DEG"), merge_dist)
+    assert indexed == reference
+
+def test_indexed_merge_matches_merge_lines_on_random_segments():
+    rng = np.random.default_rng(0)
+    start = rng.integers(0, 400, size=(500, 2))
+    angle = rng.choice([0.0, np.pi / 2, np.pi / 4], size=500) + rng.normal(0, 0.03, size=500)
+    length = rng.integers(10, 120, size=500)
+    end = start + np.rint(np.stack([np.cos(angle), np.sin(angle)], axis=1) * length[:, None]).astype(np.int64)
+    lines = np.concatenate([start, end], axis=1).astype(np.int32).reshape(-1, 1, 4)
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert merge_lines_indexed(lines, 5.0, 15) == merge_lines(lines, 5.0, 15)
+
+def test_pca_extents_match_farthest_on_collinear_groups():
+    segs = np.array([[0, 0, 10, 0], [5, 0, 30, 0], [40, 0, 25, 0], [3, 3, 13, 13], [20, 20, 9, 9], [7, 50, 7, 90]])
+    groups = [np.array([0, 1, 2]), np.array([3, 4]), np.array([5])]
+    pca, farthest = _group_extents_pca(segs, groups), _group_extents_farthest(segs, groups)
+    # Endpoints may come out in either order
+    assert sorted(map(sorted, pca.reshape(-1, 2, 2).tolist())) == sorted(map(sorted, farthest.reshape(-1, 2, 2).tolist()))
+
+@pytest.mark.parametrize("name", ["room1", "room2", "room3"])
+def test_pca_extents_close_to_farthest(room, name):
+    params, raw, merge_dist = _raw_lines(room, name)
+    segs = _segment_array(raw)
+    groups = group_lines_indexed(segs, params.get("MERGE_ANGLE_THRESHOLD_DEG"), merge_dist)
+    pca, farthest = _group_extents_pca(segs, groups), _group_extents_farthest(segs, groups)
+    pca_length = np.hypot(pca[:, 2] - pca[:, 0], pca[:, 3] - pca[:, 1])
+    farthest_length = np.hypot(farthest[:, 2] - farthest[:, 0], farthest[:, 3] - farthest[:, 1])
+    # Projections never exceed the farthest pair (up to rounding), and only shorten skewed groups a little
+    assert np.all(pca_length <= farthest_length + 1.5)
+    assert abs(pca_length.sum() / farthest_length.sum() - 1) < 0.01
@@ -0,0 +1,42 @@
+import contextlib
+import io
+import cv2
+import numpy as np
+import pytest
+from utils.preprocess import preprocess_map, clean_map, binarize_and_clean
+
+def _unfused(img, negate, params):
+    with contextlib.redirect_stdout(io.StringIO()):
+        binary = preprocess_map(img, negate, params)
+        cleaned = clean_map(binary, params)
+    return cv2.bitwise_not(binary), cv2.bitwise_not(cleaned)
+
+def _fused(img, negate, params, buffers=None):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return binarize_and_clean(img, negate, params, buffers)
+
+@pytest.mark.parametrize("name", ["room1", "room2", "room3"])
+@pytest.mark.parametrize("negate", [0, 1])
+def test_fused_matches_unfused_on_bundled_maps(room, name, negate):
+    params, _, original_map = room(name)
+    occupancy, cleaned = _fused(original_map, negate, params)
+    expected_occupancy, expected_cleaned = _unfused(original_map, negate, params)
+    assert np.array_equal(occupancy, expected_occupancy)
+    assert np.array_equal(cleaned, expected_cleaned)
+
+def test_fused_matches_unfused_with_other_values_and_kernels(room):
+    params, _, _ = room("room1")
+    rng = np.random.default_rng(0)
+    img = rng.choice(np.array([params.get("OCCUPIED_PGM_VAL"), params.get("FREE_PGM_VAL"), params.get("UNKNOWN_PGM_VAL")], dtype=np.uint8),
+                     size=(301, 257), p=[0.2, 0.6, 0.2])
+    params = dict(params, OCCUPIED_VAL=20, FREE_VAL=240, MORPH_OPEN_KERNEL_SIZE=(2, 4), MORPH_CLOSE_KERNEL_SIZE=(7, 3))
+    occupancy, cleaned = _fused(img, 0, params)
+    expected_occupancy, expected_cleaned = _unfused(img, 0, params)
+    assert np.array_equal(occupancy, expected_occupancy)
+    assert np.array_equal(cleaned, expected_cleaned)
+
+def test_fused_reuses_buffers(room):
+    params, _, original_map = room("room2")
+    buffers = (np.empty_like(original_map), np.empty_like(original_map))
+    occupancy, cleaned = _fused(original_map, 0, params, buffers)
+    assert occupancy is buffers[0] and cleaned is buffers[1]
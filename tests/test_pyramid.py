@@ -0,0 +1,48 @@
+import contextlib
+import io
+import numpy as np
+import pytest
+from main import load_parameters
+from utils.pyramid import downsample_occupancy, scale_to_level, detect_raw_lines_pyramid
+
+def _params():
+    with contextlib.redirect_stdout(io.StringIO()):
+        return load_parameters(None)
+
+def test_downsample_is_block_max():
+    img = np.zeros((7, 9), dtype=np.uint8)
+    img[0, 1] = img[5, 8] = img[6, 0] = 255
+    pooled = downsample_occupancy(img, 2)
+    expected = img[:6, :8].reshape(3, 2, 4, 2).max(axis=(1, 3))
+    assert pooled.shape == (4, 5)
+    assert np.array_equal(pooled[:3, :4], expected)
+    assert pooled[3, 0] == 255 and pooled[2, 4] == 255 and pooled[3, 4] == 0
+
+def test_scale_to_level_keeps_one_pixel():
+    assert scale_to_level(30, 4) == 8 and scale_to_level(1, 4) == 1
+
+@pytest.mark.parametrize("levels", [1, 2])
+def test_pyramid_finds_thick_walls(levels):
+    params = _params()
+    occupancy = np.zeros((600, 700), dtype=np.uint8)
+    # Four 5 px thick walls of a room, one with a door opening
+    occupancy[100:105, 100:600] = 255
+    occupancy[495:500, 100:300] = occupancy[495:500, 360:600] = 255
+    occupancy[100:500, 100:105] = occupancy[100:500, 595:600] = 255
+    with contextlib.redirect_stdout(io.StringIO()):
+        segs = detect_raw_lines_pyramid(occupancy, 60, 20, params, levels, 5.0, 15).reshape(-1, 4)
+    # Every refined segment runs along a wall, on its center line
+    mid_x, mid_y = (segs[:, 0] + segs[:, 2]) / 2, (segs[:, 1] + segs[:, 3]) / 2
+    on_wall = (np.abs(mid_y - 102) <= 1) | (np.abs(mid_y - 497) <= 1) | (np.abs(mid_x - 102) <= 1) | (np.abs(mid_x - 597) <= 1)
+    assert on_wall.all()
+    # Every wall is covered almost end to end, and the door opening stays open
+    def covered(mask, vertical):
+        span = np.zeros(700, dtype=bool)
+        for x1, y1, x2, y2 in segs[mask]:
+            a, b = sorted((y1, y2) if vertical else (x1, x2))
+            span[a:b + 1] = True
+        return span
+    top, bottom = covered(np.abs(mid_y - 102) <= 1, False), covered(np.abs(mid_y - 497) <= 1, False)
+    left, right = covered(np.abs(mid_x - 102) <= 1, True), covered(np.abs(mid_x - 597) <= 1, True)
+    assert top[110:590].all() and left[110:490].all() and right[110:490].all()
+    assert bottom[110:290].all() and bottom[370:590].all() and not bottom[310:350].any()
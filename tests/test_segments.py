@@ -0,0 +1,16 @@
+import numpy as np
+from utils.segments import WallSegments
+
+def test_properties_are_computed_once():
+    walls = WallSegments.from_lines([[[0, 0, 10, 0]], [[4, 2, 4, 8]]])
+    assert walls.midpoints.tolist() == [[5.0, 0.0], [4.0, 5.0]]
+    assert walls.lengths.tolist() == [10.0, 6.0]
+    assert walls.angles.tolist() == [0.0, 90.0]
+    assert walls.midpoints is walls.midpoints
+    assert walls.angles is walls.angles and walls.lengths is walls.lengths
+
+def test_round_trip_lines():
+    lines = [[[1, 2, 3, 4]], [[5, 6, 7, 8]]]
+    walls = WallSegments.from_lines(lines)
+    assert walls.to_lines() == lines
+    assert walls.endpoints.dtype == np.int32 and walls.endpoints.flags["C_CONTIGUOUS"]
@@ -0,0 +1,88 @@
+import argparse
+import contextlib
+import http.client
+import io
+import json
+import os
+import signal
+import threading
+import time
+import numpy as np
+import pytest
+from main import load_parameters
+from server import FloorPlanServer
+
+def _start_server(request_timeout=30, max_queue=0):
+    with contextlib.redirect_stdout(io.StringIO()):
+        params = load_parameters(None)
+    args = argparse.Namespace(workers=1, max_queue=max_queue, max_body_mb=64, request_timeout=request_timeout, verbose=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        server = FloorPlanServer(("127.0.0.1", 0), params, args)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def _grid(size, spacing=20):
+    grid = np.full((size, size), 254, dtype=np.uint8)
+    grid[::spacing, :] = 0
+    grid[:, ::spacing] = 0
+    return grid
+
+def _post(server, grid, query=""):
+    conn = http.client.HTTPConnection(*server.server_address, timeout=60)
+    path = f"/floorplan?width={grid.shape[1]}&height={grid.shape[0]}" + (f"&{query}" if query else "")
+    conn.request("POST", path, body=grid.tobytes(), headers={"Content-Type": "application/octet-stream"})
+    response = conn.getresponse()
+    status, body = response.status, json.loads(response.read() or b"{}")
+    conn.close()
+    return status, body
+
+@pytest.fixture
+def server():
+    server = _start_server()
+    yield server
+    with contextlib.redirect_stdout(io.StringIO()):
+        server.shutdown()
+        server.server_close()
+
+def test_worker_crash_answers_500_and_restarts_pool(server):
+    pool = server.pool
+    pid = next(iter(pool._processes))
+    killer = threading.Timer(0.2, os.kill, (pid, signal.SIGKILL))
+    killer.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        status, body = _post(server, _grid(3000))
+    killer.join()
+    assert status == 500 and "error" in body
+    assert server.pool is not pool
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert _post(server, _grid(200))[0] == 200
+
+def test_timed_out_request_keeps_its_slot():
+    server = _start_server(request_timeout=0.1)
+    try:
+        status, _ = _post(server, _grid(3000))
+        assert status == 504
+        # The timed-out task still occupies the only worker, so the queue is full
+        assert _post(server, _grid(200))[0] == 503
+        # Once it finishes, the slot is free again
+        server.args.request_timeout = 30
+        deadline = time.time() + 30
+        while time.time() < deadline and _post(server, _grid(200))[0] == 503: time.sleep(0.1)
+        assert _post(server, _grid(200))[0] == 200
+    finally:
+        with contextlib.redirect_stdout(io.StringIO()):
+            server.shutdown()
+            server.server_close()
+
+@pytest.mark.parametrize("origin", ["1", "1,2,3,4", "a,b", "nan,1"])
+def test_invalid_origin_answers_400(server, origin):
+    status, body = _post(server, _grid(200), f"origin={origin}")
+    assert status == 400 and "origin" in body["error"]
+
+def test_origin_sets_world_coordinates(server):
+    status, body = _post(server, _grid(200), "origin=1,2&resolution=0.5")
+    assert status == 200 and body["origin"] == [1.0, 2.0]
+    x1, y1, _, _ = body["world_segments"][0]
+    px1, py1, _, _ = body["segments"][0]
+    assert x1 == pytest.approx(1 + (px1 + 0.5) * 0.5)
+    assert y1 == pytest.approx(2 + (200 - py1 - 0.5) * 0.5)
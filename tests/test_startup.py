@@ -0,0 +1,22 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _loaded(code):
+    """Which of cv2 and numpy a fresh interpreter has imported after running code."""
+    probe = code + "\nimport sys\nprint(sorted(m for m in ('cv2', 'numpy') if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, capture_output=True, text=True, check=True)
+    return result.stdout.strip().splitlines()[-1]
+
+def test_import_main_is_lazy():
+    assert _loaded("import main") == "[]"
+
+def test_validate_only_is_lazy():
+    config = os.path.join("configs", "config_room1.yaml")
+    assert _loaded(f"import main\nassert main.main(['--validate-only', '--config', {config!r}]) == 0") == "[]"
+
+def test_pipeline_imports_on_demand():
+    code = "import main, numpy\nmain.vectorize_map(numpy.full((8, 8), 254, numpy.uint8), 0, 0.05, main.load_parameters(None))"
+    assert _loaded(code) == "['cv2', 'numpy']"
@@ -0,0 +1,16 @@
+import os
+import pytest
+from sweep import parse_grid
+
+def test_parse_grid_values():
+    grid = parse_grid(["HOUGH_THRESHOLD=20,30", "MORPH_OPEN_KERNEL_SIZE=[3, 3]"])
+    assert grid == {"HOUGH_THRESHOLD": [20, 30], "MORPH_OPEN_KERNEL_SIZE": [(3, 3)]}
+
+def test_parse_grid_rejects_empty_value_lists(tmp_path):
+    with pytest.raises(ValueError, match="No values to sweep"):
+        parse_grid(["HOUGH_THRESHOLD= "])
+    grid_file = os.path.join(tmp_path, "grid.yaml")
+    with open(grid_file, "w") as f:
+        f.write("HOUGH_THRESHOLD: [20]\nMERGE_DISTANCE_THRESHOLD_PX: []\n")
+    with pytest.raises(ValueError, match="MERGE_DISTANCE_THRESHOLD_PX"):
+        parse_grid([], grid_file)
@@ -0,0 +1,30 @@
+import contextlib
+import io
+import numpy as np
+from main import load_parameters, pixel_parameters
+from utils.tiling import clip_segments, detect_raw_lines_tiled
+
+def _params():
+    with contextlib.redirect_stdout(io.StringIO()):
+        return load_parameters(None)
+
+def test_clip_segments_to_core():
+    segs = np.array([[0, 10, 300, 10], [10, 0, 10, 300], [300, 300, 400, 400], [-50, -50, 50, 50]])
+    clipped = clip_segments(segs, 0, 0, 255, 255)
+    assert clipped.tolist() == [[0, 10, 255, 10], [10, 0, 10, 255], [0, 0, 50, 50]]
+
+def test_wall_crossing_seams_is_stitched():
+    params = _params()
+    with contextlib.redirect_stdout(io.StringIO()):
+        min_px, gap_px, _ = pixel_parameters(0.05, params)
+    grid = np.full((1000, 1000), params.get("FREE_PGM_VAL"), dtype=np.uint8)
+    # 900 px wall crossing the seams at 256, 512 and 768
+    grid[499:502, 50:950] = params.get("OCCUPIED_PGM_VAL")
+    for overlap in (0, params.get("TILE_OVERLAP_PX")):
+        with contextlib.redirect_stdout(io.StringIO()):
+            raw = detect_raw_lines_tiled(grid, 0, dict(params, TILE_OVERLAP_PX=overlap), min_px, gap_px, 256)
+        segs = np.asarray(raw).reshape(-1, 4)
+        assert len(segs) == 1
+        x_lo, x_hi = sorted(segs[0, 0::2])
+        assert x_lo <= 52 and x_hi >= 947
+        assert np.all(np.abs(segs[0, 1::2] - 500) <= 1)
@@ -0,0 +1,31 @@
+import contextlib
+import io
+import main
+
+def _validate(tmp_path, text):
+    config = tmp_path / "config.yaml"
+    config.write_text(text)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return main.validate_config(str(config))
+
+def test_empty_config_is_reported_not_raised(tmp_path):
+    problems = _validate(tmp_path, "")
+    assert problems and all(isinstance(p, str) for p in problems)
+
+def test_non_mapping_config_is_a_problem(tmp_path):
+    assert _validate(tmp_path, "- a\n- b\n") == [f"Config {tmp_path / 'config.yaml'} is not a mapping"]
+
+def test_validate_only_prints_header_before_problems(tmp_path, capsys):
+    config = tmp_path / "config.yaml"
+    config.write_text("HOUGH_THRESHOLD: -1\n")
+    assert main.main(["--validate-only", "--config", str(config)]) == 1
+    lines = capsys.readouterr().out.splitlines()
+    header = next(i for i, line in enumerate(lines) if line.startswith(f"{config}:"))
+    assert "problem(s)" in lines[header] and any("HOUGH_THRESHOLD" in line for line in lines[header + 1:])
+
+def test_validate_parameters_has_no_output(capsys):
+    with contextlib.redirect_stdout(io.StringIO()):
+        params = main.load_parameters("configs/config_room1.yaml")
+    params.update(INCREMENTAL=True, MANHATTAN_MERGE=True)
+    assert main.validate_parameters(params) == []
+    assert capsys.readouterr().out == ""
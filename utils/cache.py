@@ -0,0 +1,71 @@
+import hashlib
+import json
+import os
+import numpy as np
+
+# Bump when a stage's implementation changes so stale entries stop matching
+CACHE_VERSION = 2
+
+def file_digest(filename, chunk_size=1 << 20):
+    """SHA-256 of a file's bytes, read in chunks."""
+    h = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+class StageCache:
+    """
+    On-disk cache of intermediate pipeline arrays, stored as .npy files named by a hash of
+    the upstream key plus the parameters the stage reads. Keys chain, so a changed parameter
+    only invalidates its own stage and everything downstream of it. The directory is
+    capped at max_bytes; least recently used entries are evicted first.
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits, self.misses = [], []
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, parent_key, stage, **stage_params):
+        payload = json.dumps([CACHE_VERSION, parent_key, stage, stage_params], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".npy")
+
+    def load(self, key, stage):
+        """Returns the cached array (memory-mapped, read-only) or None."""
+        path = self._path(key)
+        try:
+            arr = np.load(path, mmap_mode='r')
+        except (FileNotFoundError, ValueError, OSError):
+            self.misses.append(stage)
+            return None
+        os.utime(path) # Mark as recently used for LRU eviction
+        self.hits.append(stage)
+        return arr
+
+    def store(self, key, arr):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp" # Atomic replace, safe with parallel batch workers
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.asarray(arr))
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """Removes least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".npy"): continue
+            try: st = os.stat(os.path.join(self.cache_dir, name))
+            except FileNotFoundError: continue
+            entries.append((st.st_mtime, st.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes: break
+            try: os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError: pass
+            total -= size
@@ -0,0 +1,93 @@
+import contextlib
+import io
+import math
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+import numpy as np
+from utils.wall_detection import _segment_array
+
+# --- Per-component Processing ---
+# Walls in separate wings or floors never interact, so the cleaned map is split into clusters
+# of occupied pixels and the raw segments are merged per cluster on a process pool. Hough runs
+# once on the whole map, so collinear walls of different clusters still share their votes.
+# Clusters are the connected components of the map dilated by the separation distance: pixels
+# of different clusters are farther apart than a Hough gap plus the merge distance, so no
+# segment can bridge two clusters and no merge across clusters is lost.
+
+def component_separation_px(hough_max_line_gap_px, merge_dist_thresh_px):
+    """
+    Dilation kernel size (odd) that joins every pair of pixels a wall could connect.
+
+    A Hough segment bridges gaps of up to hough_max_line_gap_px steps along its major axis,
+    so each of its points is within sqrt(2) * gap / 2 of an occupied pixel of its cluster.
+    Clusters more than merge distance + sqrt(2) * gap apart therefore yield segments that
+    are never within merge distance of each other.
+    """
+    size = int(math.ceil(merge_dist_thresh_px + math.sqrt(2) * hough_max_line_gap_px)) + 2
+    return size | 1
+
+class ComponentPartition:
+    """Cluster labels of the dilated occupancy map and the bounding box of each cluster."""
+
+    def __init__(self, occupancy_img, separation_px):
+        self.separation = separation_px
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (separation_px, separation_px))
+        grown = cv2.dilate(occupancy_img, kernel)
+        count, self.labels, stats, _ = cv2.connectedComponentsWithStats(grown, connectivity=8, ltype=cv2.CV_32S)
+        self.count = count - 1
+        self.boxes = stats[1:, :4] # x, y, width, height of labels 1..count
+        self.areas = stats[1:, 4]
+
+    def assign(self, segs):
+        """
+        Cluster label per (N, 4) segment, or None if a segment's endpoints and midpoint do not
+        all lie in one cluster (segments from another detector, or a different map).
+        """
+        height, width = self.labels.shape
+        def label_at(x, y):
+            return self.labels[np.clip(np.rint(y).astype(np.int64), 0, height - 1), np.clip(np.rint(x).astype(np.int64), 0, width - 1)]
+        start = label_at(segs[:, 0], segs[:, 1])
+        end = label_at(segs[:, 2], segs[:, 3])
+        mid = label_at((segs[:, 0] + segs[:, 2]) / 2, (segs[:, 1] + segs[:, 3]) / 2)
+        if (start == 0).any() or (start != end).any() or (start != mid).any(): return None
+        return start
+
+def _init_worker():
+    # One OpenCV thread per worker process, the pool provides the parallelism
+    cv2.setNumThreads(1)
+
+def _merge_job(merge_fn, segs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return merge_fn(segs.astype(np.int32).reshape(-1, 1, 4))
+
+def _run_jobs(fn, jobs, sizes, workers):
+    """Runs fn(*job) for every job and returns the results in job order, largest jobs first."""
+    if workers <= 1 or len(jobs) <= 1: return [fn(*job) for job in jobs]
+    results = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), initializer=_init_worker) as pool:
+        futures = {i: pool.submit(fn, *jobs[i]) for i in np.argsort(sizes, kind="stable")[::-1]}
+        for i, future in futures.items():
+            results[i] = future.result()
+    return results
+
+def merge_lines_components(lines, partition, merge_fn, workers):
+    """
+    Runs merge_fn (lines -> merged [[x1, y1, x2, y2]] lists) per cluster and concatenates the
+    results by cluster. Falls back to one merge over all lines if any segment is not inside a
+    single cluster, so no merge across clusters is lost.
+    """
+    if not len(lines): return []
+    segs = _segment_array(lines)
+    labels = partition.assign(segs)
+    if labels is None:
+        print("  Segments cross component boundaries, merging the whole map at once.")
+        return merge_fn(lines)
+    # Stable sort keeps each cluster's segments in their original order, as a full merge sees them
+    order = np.argsort(labels, kind="stable")
+    starts = np.flatnonzero(np.diff(labels[order], prepend=-1))
+    chunks = np.split(order, starts[1:])
+    print(f"Merging {len(segs)} raw lines in {len(chunks)} components ({workers} workers)...")
+    results = _run_jobs(_merge_job, [(merge_fn, segs[idx]) for idx in chunks], [len(idx) for idx in chunks], workers)
+    merged_lines_final = [line for result in results for line in result]
+    print(f"  Merged into {len(merged_lines_final)} final line segments.")
+    return merged_lines_final
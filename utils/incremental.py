@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import cv2
+import numpy as np
+from utils.preprocess import binarize_and_clean, PREPROCESS_PARAMS, CLEAN_PARAMS
+from utils.wall_detection import detect_raw_lines_occupancy, group_lines_indexed, EXTENT_METHODS, HOUGH_PARAMS, _segment_array
+from utils.tiling import tile_margin_px
+
+# --- Incremental Re-vectorization ---
+# State from the previous run (grid, raw segments, their merge groups and the merged walls)
+# is kept next to the outputs. On the next run only the regions where the grid changed are
+# re-detected, and only merge groups touching those regions are re-merged.
+
+STATE_VERSION = 1
+DIRTY_BLOCK_PX = 32 # Granularity of the change mask
+
+# Merge settings incremental runs do not apply (they always use the general merge). They are
+# still hashed, like every other merge setting, so toggling them forces a full run.
+IGNORED_MERGE_PARAMS = ("MANHATTAN_MERGE", "MANHATTAN_SNAP_DEG")
+
+def _settings_hash(negate, resolution, params, pixel_args):
+    keys = PREPROCESS_PARAMS + CLEAN_PARAMS + HOUGH_PARAMS + IGNORED_MERGE_PARAMS
+    payload = json.dumps([STATE_VERSION, negate, resolution, {k: params.get(k) for k in keys}, pixel_args], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def load_state(prefix):
+    """Loads the previous run's state, or None if there is none."""
+    try:
+        grid = np.load(prefix + "_grid.npy", mmap_mode='r')
+        with np.load(prefix + "_walls.npz") as data:
+            state = {k: data[k] for k in data.files}
+    except (FileNotFoundError, ValueError, OSError):
+        return None
+    state["grid"] = grid
+    state["settings"] = str(state["settings"])
+    return state
+
+def save_state(prefix, grid, raw_segs, labels, merged, origin, settings):
+    # Write then rename: the previous grid may still be memory-mapped
+    os.makedirs(os.path.dirname(os.path.abspath(prefix)), exist_ok=True)
+    with open(prefix + "_grid.npy.tmp", 'wb') as f:
+        np.save(f, np.asarray(grid))
+    with open(prefix + "_walls.npz.tmp", 'wb') as f:
+        np.savez(f, raw=raw_segs, labels=labels, merged=merged,
+                 origin=np.asarray(origin[:2], dtype=np.float64), settings=np.asarray(settings))
+    os.replace(prefix + "_grid.npy.tmp", prefix + "_grid.npy")
+    os.replace(prefix + "_walls.npz.tmp", prefix + "_walls.npz")
+
+def align_previous(prev_grid, prev_origin, grid, origin, resolution, fill_value):
+    """
+    Places the previous grid in the new grid's pixel frame (SLAM maps grow and shift their
+    origin). Returns (aligned_prev, (dy, dx)) or (None, None) if the old map does not fit.
+    """
+    shift = (np.asarray(prev_origin[:2]) - np.asarray(origin[:2])) / resolution
+    if not np.allclose(shift, np.rint(shift), atol=1e-3): return None, None
+    dx = int(np.rint(shift[0]))
+    # Image rows grow downwards while world y grows upwards
+    dy = (grid.shape[0] - prev_grid.shape[0]) - int(np.rint(shift[1]))
+    if dy < 0 or dx < 0 or dy + prev_grid.shape[0] > grid.shape[0] or dx + prev_grid.shape[1] > grid.shape[1]:
+        return None, None
+    if (dy, dx) == (0, 0) and prev_grid.shape == grid.shape: return prev_grid, (0, 0)
+    aligned = np.full(grid.shape, fill_value, dtype=grid.dtype)
+    aligned[dy:dy + prev_grid.shape[0], dx:dx + prev_grid.shape[1]] = prev_grid
+    return aligned, (dy, dx)
+
+def dirty_boxes(prev_grid, grid, pad_px, block=DIRTY_BLOCK_PX):
+    """Bounding boxes (y0, y1, x0, x1) of changed pixels, padded by pad_px and snapped to blocks."""
+    height, width = grid.shape
+    hb, wb = -(-height // block), -(-width // block)
+    diff = np.zeros((hb * block, wb * block), dtype=bool)
+    np.not_equal(prev_grid, grid, out=diff[:height, :width])
+    blocks = diff.reshape(hb, block, wb, block).any(axis=(1, 3)).astype(np.uint8)
+    if not blocks.any(): return []
+    grow = -(-pad_px // block)
+    blocks = cv2.dilate(blocks, np.ones((2 * grow + 1, 2 * grow + 1), np.uint8))
+    num, _, stats, _ = cv2.connectedComponentsWithStats(blocks, connectivity=8)
+    boxes = []
+    for x, y, w, h, _ in stats[1:]: # Label 0 is the background
+        boxes.append((y * block, min(height, (y + h) * block), x * block, min(width, (x + w) * block)))
+    return boxes
+
+def _midpoints_in(segs, box):
+    y0, y1, x0, x1 = box
+    mx, my = (segs[:, 0] + segs[:, 2]) / 2, (segs[:, 1] + segs[:, 3]) / 2
+    return (mx >= x0) & (mx < x1) & (my >= y0) & (my < y1)
+
+def _touches(segs, box, dist):
+    """Segments whose bounding box comes within dist of box."""
+    y0, y1, x0, x1 = box
+    return ((np.minimum(segs[:, 0], segs[:, 2]) <= x1 + dist) & (np.maximum(segs[:, 0], segs[:, 2]) >= x0 - dist) &
+            (np.minimum(segs[:, 1], segs[:, 3]) <= y1 + dist) & (np.maximum(segs[:, 1], segs[:, 3]) >= y0 - dist))
+
+def _labels_from_groups(groups, num_segments, offset=0):
+    labels = np.empty(num_segments, dtype=np.int64)
+    for g, members in enumerate(groups): labels[members] = g + offset
+    return labels
+
+def _detect_window(grid, window, negate, params, hough_min_line_length_px, hough_max_line_gap_px):
+    y0, y1, x0, x1 = window
+    _, cleaned = binarize_and_clean(np.ascontiguousarray(grid[y0:y1, x0:x1]), negate, params)
+    lines = detect_raw_lines_occupancy(cleaned, hough_min_line_length_px, hough_max_line_gap_px, params)
+    if not len(lines): return np.empty((0, 4), dtype=np.int64)
+    return _segment_array(lines) + np.array([x0, y0, x0, y0])
+
+def vectorize_incremental(grid, negate, resolution, origin, params, hough_min_line_length_px, hough_max_line_gap_px,
+                          angle_thresh_deg, merge_dist_thresh_px, extent_method, state_prefix):
+    """
+    Detects and merges walls, reusing the previous run's results outside changed regions.
+
+    Falls back to a full run when there is no compatible state (first run, changed
+    parameters or resolution, non-integral origin shift, or a shrunk map).
+
+    Returns:
+        tuple: (raw_lines (N, 1, 4) int32, merged_wall_lines list, info dict)
+    """
+    if params.get("MANHATTAN_MERGE"):
+        print("Warning: MANHATTAN_MERGE is ignored in incremental mode, the general merge is used.")
+    pixel_args = [hough_min_line_length_px, hough_max_line_gap_px, angle_thresh_deg, merge_dist_thresh_px, extent_method]
+    settings = _settings_hash(negate, resolution, params, pixel_args)
+    state = load_state(state_prefix)
+    aligned = shift = None
+    if state is not None and state["settings"] == settings:
+        aligned, shift = align_previous(state["grid"], state["origin"], grid, origin, resolution, params.get("UNKNOWN_PGM_VAL"))
+    extents = EXTENT_METHODS[extent_method]
+
+    if aligned is None:
+        print("Incremental: no compatible previous state, vectorizing the whole map.")
+        raw = _detect_window(grid, (0, grid.shape[0], 0, grid.shape[1]), negate, params, hough_min_line_length_px, hough_max_line_gap_px)
+        groups = group_lines_indexed(raw, angle_thresh_deg, merge_dist_thresh_px) if len(raw) else []
+        labels = _labels_from_groups(groups, len(raw))
+        merged = extents(raw, groups) if groups else np.empty((0, 4), dtype=np.int64)
+        info = {"mode": "full", "dirty_regions": 0, "dirty_pixels": int(grid.size)}
+    else:
+        dy, dx = shift
+        offset = np.array([dx, dy, dx, dy])
+        old_raw, old_labels, old_merged = state["raw"] + offset, state["labels"], state["merged"] + offset
+        margin = tile_margin_px(params, hough_max_line_gap_px)
+        boxes = dirty_boxes(aligned, grid, margin)
+        print(f"Incremental: map shifted by ({dx}, {dy}) px, {len(boxes)} dirty regions.")
+
+        # Re-detect inside each dirty region, with a margin of context around it
+        removed = np.zeros(len(old_raw), dtype=bool)
+        new_segs = [np.empty((0, 4), dtype=np.int64)]
+        for box in boxes:
+            y0, y1, x0, x1 = box
+            window = (max(0, y0 - margin), min(grid.shape[0], y1 + margin), max(0, x0 - margin), min(grid.shape[1], x1 + margin))
+            segs = _detect_window(grid, window, negate, params, hough_min_line_length_px, hough_max_line_gap_px)
+            new_segs.append(segs[_midpoints_in(segs, box)])
+            removed |= _midpoints_in(old_raw, box)
+        new_segs = np.concatenate(new_segs)
+
+        # Groups that lost a segment or lie within merge distance of a dirty region get re-merged
+        near = np.zeros(len(old_raw), dtype=bool)
+        for box in boxes: near |= _touches(old_raw, box, merge_dist_thresh_px)
+        affected = np.unique(old_labels[removed | near])
+        stable_groups = np.setdiff1d(np.arange(len(old_merged)), affected)
+        stable_mask = np.isin(old_labels, stable_groups) & ~removed
+        remerge = np.concatenate([old_raw[~stable_mask & ~removed], new_segs])
+
+        groups = group_lines_indexed(remerge, angle_thresh_deg, merge_dist_thresh_px) if len(remerge) else []
+        remerged = extents(remerge, groups) if groups else np.empty((0, 4), dtype=np.int64)
+        # Stable groups keep their walls; relabel them 0..k-1 and append the new groups
+        relabel = np.full(len(old_merged), -1, dtype=np.int64)
+        relabel[stable_groups] = np.arange(len(stable_groups))
+        raw = np.concatenate([old_raw[stable_mask], remerge])
+        labels = np.concatenate([relabel[old_labels[stable_mask]], _labels_from_groups(groups, len(remerge), len(stable_groups))])
+        merged = np.concatenate([old_merged[stable_groups], remerged])
+        dirty_pixels = sum((y1 - y0) * (x1 - x0) for y0, y1, x0, x1 in boxes)
+        info = {"mode": "incremental", "dirty_regions": len(boxes), "dirty_pixels": int(dirty_pixels),
+                "redetected_segments": int(len(new_segs)), "remerged_segments": int(len(remerge)),
+                "reused_walls": int(len(stable_groups))}
+
+    if info["mode"] == "full" or info["dirty_regions"] or shift != (0, 0):
+        save_state(state_prefix, grid, raw, labels, merged, origin, settings)
+    print(f"  {len(raw)} raw segments, {len(merged)} merged walls ({info['mode']}).")
+    merged_wall_lines = [[[int(v) for v in row]] for row in merged]
+    return raw.astype(np.int32).reshape(-1, 1, 4), merged_wall_lines, info
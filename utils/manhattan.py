@@ -0,0 +1,122 @@
+import numpy as np
+from utils.wall_detection import group_lines_indexed, EXTENT_METHODS, _segment_array, _segment_angles
+
+# --- Manhattan-world Merging ---
+# Most buildings have walls along two orthogonal directions. The dominant orientation is
+# estimated once from the raw segments, segments within a snap tolerance of either axis are
+# rotated into that frame, and merging becomes a 1-D interval union per (axis, offset) run
+# over sorted arrays. Off-axis segments go through the general merge.
+
+def dominant_orientation(segs, bin_deg=1.0):
+    """
+    Dominant wall orientation in degrees [0, 90) from a length-weighted angle histogram.
+
+    Angles are folded modulo 90, so both wall directions vote for the same peak. The peak
+    is refined with a weighted circular mean of the angles near it.
+    """
+    angles = _segment_angles(segs) % 90
+    lengths = np.hypot(segs[:, 2] - segs[:, 0], segs[:, 3] - segs[:, 1])
+    num_bins = int(round(90 / bin_deg))
+    hist = np.bincount((angles / bin_deg).astype(np.int64) % num_bins, lengths, num_bins)
+    # Circular smoothing over +-1 bin
+    hist = hist + np.roll(hist, 1) + np.roll(hist, -1)
+    peak = (np.argmax(hist) + 0.5) * bin_deg
+    # Period 90: average angles as points on a circle at 4x their angle
+    near = np.abs((angles - peak + 45) % 90 - 45) <= 2 * bin_deg
+    phase = np.radians(angles[near] * 4)
+    mean = np.degrees(np.arctan2((lengths[near] * np.sin(phase)).sum(), (lengths[near] * np.cos(phase)).sum())) / 4
+    return float(mean % 90)
+
+def _offset_chains(offset, dist_thresh_px):
+    """
+    Chain id per segment. Sorted offsets are cut into chains whose offsets all lie within
+    dist_thresh_px of the chain's first one, so every pair in a chain is within merge distance.
+    """
+    by_offset = np.argsort(offset, kind="stable")
+    sorted_offset = offset[by_offset]
+    chain_sorted = np.empty(len(offset), dtype=np.int64)
+    start, chain_id = 0, 0
+    while start < len(offset):
+        end = np.searchsorted(sorted_offset, sorted_offset[start] + dist_thresh_px, side="right")
+        chain_sorted[start:end] = chain_id
+        start, chain_id = end, chain_id + 1
+    chain = np.empty(len(offset), dtype=np.int64)
+    chain[by_offset] = chain_sorted
+    return chain
+
+def _axis_runs(u0, u1, offset, weight, dist_thresh_px):
+    """
+    Interval union along one axis. Segments are chained by offset (no two offsets in a chain
+    more than dist_thresh_px apart), then within each chain intervals sorted by start are
+    joined while the next start is within dist_thresh_px of the running end.
+
+    Returns:
+        tuple: (start, end, weighted mean offset) arrays, one entry per merged wall.
+    """
+    chain = _offset_chains(offset, dist_thresh_px)
+
+    order = np.lexsort((u0, chain))
+    u0, u1, offset, weight, chain = u0[order], u1[order], offset[order], weight[order], chain[order]
+    # Running end per chain: shift each chain above the previous one so one accumulate suffices
+    span = float(max(u1.max() - u0.min(), 0)) + 2 * dist_thresh_px + 1
+    shifted_end = np.maximum.accumulate(u1 + chain * span) - chain * span
+    new_run = np.ones(len(u0), dtype=bool)
+    new_run[1:] = (chain[1:] != chain[:-1]) | (u0[1:] > shifted_end[:-1] + dist_thresh_px)
+    run = np.cumsum(new_run) - 1
+    starts = np.flatnonzero(new_run)
+
+    start = np.minimum.reduceat(u0, starts)
+    end = np.maximum.reduceat(u1, starts)
+    mean_offset = np.bincount(run, offset * weight) / np.maximum(np.bincount(run, weight), 1e-9)
+    return start, end, mean_offset
+
+def merge_lines_manhattan(lines, angle_thresh_deg, dist_thresh_px, extent_method="farthest", snap_deg=2.0):
+    """
+    Merges segments by snapping them to the dominant orientation and taking 1-D interval
+    unions per axis. Segments more than snap_deg off both axes use merge_lines_indexed's
+    grouping and extent_method.
+
+    Returns:
+        list: Merged segments as [[x1, y1, x2, y2]] lists, axis walls first.
+    """
+    if not len(lines): return []
+    if extent_method not in EXTENT_METHODS:
+        raise ValueError(f"Unknown extent method '{extent_method}', expected one of {sorted(EXTENT_METHODS)}")
+    segs = _segment_array(lines)
+    theta = dominant_orientation(segs)
+    print(f"Merging {len(lines)} raw lines (Manhattan, dominant orientation {theta:.2f} deg)...")
+
+    # Rotate by -theta: axis 0 walls become horizontal, axis 1 walls vertical
+    c, s = np.cos(np.radians(theta)), np.sin(np.radians(theta))
+    pts = segs.reshape(-1, 2, 2).astype(np.float64)
+    u = pts[:, :, 0] * c + pts[:, :, 1] * s
+    v = -pts[:, :, 0] * s + pts[:, :, 1] * c
+    rel = (_segment_angles(segs) - theta) % 180
+    axis = np.full(len(segs), -1)
+    axis[np.minimum(rel, 180 - rel) <= snap_deg] = 0
+    axis[np.abs(rel - 90) <= snap_deg] = 1
+
+    walls = []
+    for a, (along, across) in enumerate(((u, v), (v, u))):
+        members = np.flatnonzero(axis == a)
+        if not len(members): continue
+        lo, hi = along[members].min(axis=1), along[members].max(axis=1)
+        start, end, offset = _axis_runs(lo, hi, across[members].mean(axis=1), hi - lo + 1, dist_thresh_px)
+        ends = np.stack([start, offset, end, offset], axis=1) if a == 0 else np.stack([offset, start, offset, end], axis=1)
+        # Back to image coordinates
+        x = ends[:, 0::2] * c - ends[:, 1::2] * s
+        y = ends[:, 0::2] * s + ends[:, 1::2] * c
+        walls.append(np.rint(np.stack([x[:, 0], y[:, 0], x[:, 1], y[:, 1]], axis=1)).astype(np.int64))
+
+    off_axis = segs[axis < 0]
+    if len(off_axis):
+        groups = group_lines_indexed(off_axis, angle_thresh_deg, dist_thresh_px)
+        walls.append(EXTENT_METHODS[extent_method](off_axis, groups))
+    merged = np.concatenate(walls) if walls else np.empty((0, 4), dtype=np.int64)
+    # Rotating back and rounding can move an endpoint past the map edge; keep walls within the raw extent
+    np.clip(merged[:, 0::2], segs[:, 0::2].min(), segs[:, 0::2].max(), out=merged[:, 0::2])
+    np.clip(merged[:, 1::2], segs[:, 1::2].min(), segs[:, 1::2].max(), out=merged[:, 1::2])
+    merged_lines_final = [[[int(v) for v in row]] for row in merged]
+
+    print(f"  Merged into {len(merged_lines_final)} final line segments ({int((axis >= 0).sum())} snapped, {len(off_axis)} off-axis raw lines).")
+    return merged_lines_final
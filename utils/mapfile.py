@@ -0,0 +1,103 @@
+import os
+import yaml
+
+# --- Map YAML and PGM Header ---
+# Reading map metadata needs neither OpenCV nor NumPy, so configs can be checked without them.
+
+def load_yaml_metadata(yaml_filename,params):
+    metadata = {
+        'resolution': params.get("DEFAULT_RESOLUTION"), 'negate': params.get("DEFAULT_NEGATE"), 'origin': params.get("DEFAULT_ORIGIN"),
+        'occupied_thresh': 0.65, 'free_thresh': 0.196, 'image': None
+    }
+    try:
+        with open(yaml_filename, 'r') as f: yaml_data = yaml.safe_load(f)
+        if not yaml_data: return metadata # Empty YAML
+
+        metadata['resolution'] = float(yaml_data.get('resolution', metadata['resolution']))
+        metadata['negate'] = int(yaml_data.get('negate', metadata['negate']))
+        origin_yaml = yaml_data.get('origin', metadata['origin'])
+        if isinstance(origin_yaml, list) and len(origin_yaml) >= 2:
+             metadata['origin'] = [float(origin_yaml[0]), float(origin_yaml[1]), float(origin_yaml[2]) if len(origin_yaml) > 2 else 0.0]
+        metadata['occupied_thresh'] = float(yaml_data.get('occupied_thresh', metadata['occupied_thresh']))
+        metadata['free_thresh'] = float(yaml_data.get('free_thresh', metadata['free_thresh']))
+        metadata['image'] = yaml_data.get('image', metadata['image'])
+        print(f"Loaded YAML: Res={metadata['resolution']}, Negate={metadata['negate']}, Origin={metadata['origin']}, Image={metadata['image']}")
+
+        if metadata['image'] and not os.path.isabs(metadata['image']):
+             yaml_dir = os.path.dirname(os.path.abspath(yaml_filename))
+             metadata['image'] = os.path.join(yaml_dir, metadata['image'])
+             metadata['image'] = os.path.normpath(metadata['image'])
+             print(f"  Resolved Image Path: {metadata['image']}")
+    except FileNotFoundError: print(f"Warning: YAML file not found: {yaml_filename}. Using defaults.")
+    except Exception as e: print(f"Warning: Error loading YAML {yaml_filename}: {e}. Using defaults.")
+    return metadata
+
+def read_pgm_header(filename):
+    """
+    Parses a binary (P5) PGM header. Returns (width, height, maxval, data_offset), or None if
+    the file is not a binary PGM. Raises ValueError if the header is malformed.
+    """
+    with open(filename, 'rb') as f:
+        if f.read(2) != b'P5': return None
+        fields, c = [], f.read(1)
+        while len(fields) < 3:
+            if c == b'#': # Comment runs to end of line, however long
+                f.readline()
+                c = f.read(1)
+                continue
+            if c.isspace():
+                c = f.read(1)
+                continue
+            digits = b''
+            while c.isdigit():
+                digits += c
+                c = f.read(1)
+            if not digits: raise ValueError(f"{filename}: malformed PGM header (expected width, height and maxval, got {c!r})")
+            fields.append(int(digits))
+        # Exactly one whitespace byte before the raster
+        if not c.isspace(): raise ValueError(f"{filename}: malformed PGM header (no whitespace after maxval)")
+        width, height, maxval = fields
+        if width <= 0 or height <= 0 or not 0 < maxval < 65536:
+            raise ValueError(f"{filename}: malformed PGM header (width {width}, height {height}, maxval {maxval})")
+        return width, height, maxval, f.tell()
+
+def check_map_yaml(yaml_filename):
+    """
+    Strict version of load_yaml_metadata for validation: instead of falling back to the
+    defaults, returns a list of problems with the map YAML and its image (empty if none).
+    """
+    if not yaml_filename or not os.path.isfile(yaml_filename): return [f"Map YAML not found: {yaml_filename}"]
+    try:
+        with open(yaml_filename, 'r') as f: data = yaml.safe_load(f)
+    except yaml.YAMLError as e:
+        return [f"Map YAML {yaml_filename} does not parse: {e}"]
+    if not isinstance(data, dict): return [f"Map YAML {yaml_filename} is not a mapping"]
+
+    problems = []
+    resolution = data.get("resolution")
+    if resolution is not None and (isinstance(resolution, bool) or not isinstance(resolution, (int, float)) or resolution <= 0):
+        problems.append(f"{yaml_filename}: 'resolution' must be a positive number, got {resolution!r}")
+    if "negate" in data and data["negate"] not in (0, 1):
+        problems.append(f"{yaml_filename}: 'negate' must be 0 or 1, got {data['negate']!r}")
+    origin = data.get("origin")
+    if origin is not None and (not isinstance(origin, list) or not 2 <= len(origin) <= 3 or
+                               any(isinstance(v, bool) or not isinstance(v, (int, float)) for v in origin)):
+        problems.append(f"{yaml_filename}: 'origin' must be [x, y] or [x, y, yaw], got {origin!r}")
+
+    image = data.get("image")
+    if not image: return problems + [f"{yaml_filename}: no 'image' entry"]
+    if not os.path.isabs(image): image = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(yaml_filename)), image))
+    if not os.path.isfile(image): return problems + [f"{yaml_filename}: image not found: {image}"]
+    if image.lower().endswith(".pgm"):
+        with open(image, 'rb') as f: magic = f.read(2)
+        if magic == b'P5':
+            try:
+                width, height, maxval, offset = read_pgm_header(image)
+            except ValueError as e:
+                problems.append(str(e))
+            else:
+                if os.path.getsize(image) < offset + width * height * (1 if maxval < 256 else 2):
+                    problems.append(f"{image}: truncated ({width}x{height} PGM)")
+        elif magic != b'P2':
+            problems.append(f"{image}: not a PGM file")
+    return problems
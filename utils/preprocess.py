@@ -1,6 +1,10 @@
 import cv2
 import numpy as np
 
+# Parameters read by each stage (used to key cached results)
+PREPROCESS_PARAMS = ("OCCUPIED_PGM_VAL", "FREE_PGM_VAL", "OCCUPIED_VAL", "FREE_VAL")
+CLEAN_PARAMS = ("MORPH_OPEN_KERNEL_SIZE", "MORPH_CLOSE_KERNEL_SIZE")
+
 def preprocess_map(img, negate,params):
     # outputs binary 0/255
     if img is None: return None
@@ -8,7 +12,7 @@ def preprocess_map(img, negate,params):
     pgm_occupied = params.get("OCCUPIED_PGM_VAL") if not negate else params.get("FREE_PGM_VAL")
     occupied_pixels = (img == pgm_occupied)
     processed_img[occupied_pixels] = params.get("OCCUPIED_VAL")
-    print(f"Preprocessing done (negate={negate}). Output unique values: {np.unique(processed_img)}")
+    print(f"Preprocessing done (negate={negate}).")
     return processed_img
 
 def clean_map(binary_img,params):
@@ -24,4 +28,45 @@ def clean_map(binary_img,params):
     closed_inverted = cv2.morphologyEx(inverted_img, cv2.MORPH_CLOSE, close_kernel)
     cleaned_img = cv2.bitwise_not(closed_inverted)
     print(f"  Applied Opening {MORPH_OPEN_KERNEL_SIZE}, Closing {MORPH_CLOSE_KERNEL_SIZE}")
-    return cleaned_img
\ No newline at end of file
+    return cleaned_img
+
+# --- Fused Binarize + Clean ---
+# Works in the "occupied = 255" polarity HoughLinesP needs. Since opening is the dual of
+# closing (open(x) == ~close(~x) for these symmetric kernels and OpenCV's border handling),
+# clean_map followed by the inversion in detect_raw_lines equals two closings of the
+# inverted binary map, with no intermediate inversions.
+
+def _buffer(buf, shape):
+    return buf if buf is not None and buf.shape == shape else np.empty(shape, dtype=np.uint8)
+
+def binarize_and_clean(img, negate, params, buffers=None):
+    """
+    Fused preprocess_map + clean_map + inversion.
+
+    Args:
+        img: Input PGM array.
+        negate: Map negate flag from the YAML metadata.
+        params: Pipeline parameters.
+        buffers: Optional (occupancy, cleaned) uint8 arrays to reuse as outputs;
+                 reallocated if their shape does not match img.
+
+    Returns:
+        (occupancy, cleaned_occupancy): bitwise_not of preprocess_map's and clean_map's
+        outputs, i.e. 255 = occupied for the default OCCUPIED_VAL/FREE_VAL.
+    """
+    if img is None: return None, None
+    occupancy = _buffer(buffers[0] if buffers else None, img.shape)
+    cleaned = _buffer(buffers[1] if buffers else None, img.shape)
+    pgm_occupied = params.get("OCCUPIED_PGM_VAL") if not negate else params.get("FREE_PGM_VAL")
+    occupied_val, free_val = 255 - params.get("OCCUPIED_VAL"), 255 - params.get("FREE_VAL")
+    if (occupied_val, free_val) == (255, 0):
+        cv2.compare(img, pgm_occupied, cv2.CMP_EQ, dst=occupancy)
+    else:
+        np.copyto(occupancy, np.where(img == pgm_occupied, occupied_val, free_val), casting='unsafe')
+
+    open_kernel = np.ones(tuple(params.get("MORPH_OPEN_KERNEL_SIZE")), np.uint8)
+    close_kernel = np.ones(tuple(params.get("MORPH_CLOSE_KERNEL_SIZE")), np.uint8)
+    cv2.morphologyEx(occupancy, cv2.MORPH_CLOSE, open_kernel, dst=cleaned)
+    cv2.morphologyEx(cleaned, cv2.MORPH_CLOSE, close_kernel, dst=cleaned)
+    print(f"Binarized and cleaned map (negate={negate}), opening {tuple(open_kernel.shape)}, closing {tuple(close_kernel.shape)}")
+    return occupancy, cleaned
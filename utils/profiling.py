@@ -0,0 +1,90 @@
+import contextlib
+import cProfile
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource # Unix only
+except ImportError:
+    resource = None
+
+def _peak_rss_bytes():
+    """Peak resident set size of this process so far, or None where unavailable."""
+    if resource is None: return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024 # Linux reports KiB
+
+class StageProfiler:
+    """
+    Records wall time, CPU time, peak memory growth and item counts for each pipeline stage.
+
+    Memory is the growth of the process peak RSS during the stage (0 once an earlier stage
+    has set a higher peak). With trace_memory=True, tracemalloc additionally reports the
+    peak bytes allocated by Python/NumPy/OpenCV arrays inside each stage.
+    One stage can be run under cProfile, with stats dumped to cprofile_path.
+    """
+
+    def __init__(self, run_name=None, trace_memory=False, cprofile_stage=None, cprofile_path=None):
+        self.run_name = run_name
+        self.trace_memory = trace_memory
+        self.cprofile_stage = cprofile_stage
+        self.cprofile_path = cprofile_path or (f"{cprofile_stage}.prof" if cprofile_stage else None)
+        self.stages = []
+        self.started_at = time.time()
+        if trace_memory and not tracemalloc.is_tracing(): tracemalloc.start()
+
+    @contextlib.contextmanager
+    def stage(self, name, **counts):
+        """Profiles the enclosed block. Yields the stage record so callers can add counts."""
+        record = {"stage": name, **counts}
+        profiler = cProfile.Profile() if name == self.cprofile_stage else None
+        rss_before = _peak_rss_bytes()
+        if self.trace_memory:
+            traced_before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        if profiler: profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler: profiler.disable()
+            record["wall_s"] = time.perf_counter() - wall_start
+            record["cpu_s"] = time.process_time() - cpu_start
+            if rss_before is not None:
+                record["peak_rss_delta_mb"] = (_peak_rss_bytes() - rss_before) / 2**20
+            if self.trace_memory:
+                record["traced_peak_mb"] = (tracemalloc.get_traced_memory()[1] - traced_before) / 2**20
+            if profiler:
+                profiler.dump_stats(self.cprofile_path)
+                record["cprofile"] = self.cprofile_path
+            self.stages.append(record)
+
+    def timings(self):
+        """Wall time per stage name, summed over repeated stages."""
+        totals = {}
+        for record in self.stages:
+            totals[record["stage"]] = totals.get(record["stage"], 0.0) + record["wall_s"]
+        return totals
+
+    def report(self, **extra):
+        peak = _peak_rss_bytes()
+        return {
+            "run": self.run_name,
+            "started_at": self.started_at,
+            "host": platform.node(),
+            "pid": os.getpid(),
+            "total_wall_s": sum(r["wall_s"] for r in self.stages),
+            "total_cpu_s": sum(r["cpu_s"] for r in self.stages),
+            "peak_rss_mb": peak / 2**20 if peak is not None else None,
+            "stages": self.stages,
+            **extra,
+        }
+
+def append_report(path, report):
+    """Appends one run report as a JSON line."""
+    with open(path, 'a') as f:
+        f.write(json.dumps(report, default=str) + "\n")
@@ -0,0 +1,137 @@
+import cv2
+import numpy as np
+from utils.wall_detection import detect_raw_lines_occupancy, merge_lines_indexed, _segment_array, _expand_ranges
+
+# --- Coarse-to-fine Wall Detection ---
+# Hough runs on a max-pooled copy of the cleaned map (2**levels smaller per axis), with the
+# pixel thresholds scaled to that level. Coarse segments are merged at the coarse level,
+# then each one is refined at full resolution from the occupied pixels in a narrow band
+# around it: a least-squares fit of the wall line, split wherever the pixels have a gap
+# larger than the Hough line gap.
+
+def scale_to_level(value_px, factor):
+    """A full-resolution pixel threshold at a pyramid level `factor` times smaller (at least 1)."""
+    return max(1, int(round(value_px / factor)))
+
+def downsample_occupancy(occupancy_img, factor):
+    """Max-pools an occupied = 255 image by factor, so walls thinner than a block survive."""
+    # Dilating with a kernel anchored at its top-left corner puts each block's maximum at
+    # the block's first pixel, so the strided slice is the pooled image
+    pooled = cv2.dilate(occupancy_img, np.ones((factor, factor), np.uint8), anchor=(0, 0), borderType=cv2.BORDER_CONSTANT, borderValue=0)
+    return np.ascontiguousarray(pooled[::factor, ::factor])
+
+class _PixelIndex:
+    """Occupied pixel coordinates bucketed by grid cell, stored as sorted integer keys."""
+
+    def __init__(self, occupancy_img, cell_size):
+        self.cell = cell_size
+        ys, xs = np.nonzero(occupancy_img)
+        self.ny, self.nx = -(-occupancy_img.shape[0] // cell_size), -(-occupancy_img.shape[1] // cell_size)
+        keys = (xs // cell_size) * self.ny + ys // cell_size
+        order = np.argsort(keys, kind="stable")
+        self.keys, self.xs, self.ys = keys[order], xs[order].astype(np.float64), ys[order].astype(np.float64)
+
+    def near_segments(self, segs):
+        """
+        (segment, pixel) pairs for the pixels in the cells along each segment and their 8 neighbours.
+        Returns (segment indices, pixel x, pixel y).
+        """
+        # Sample each segment every half cell
+        lengths = np.hypot(segs[:, 2] - segs[:, 0], segs[:, 3] - segs[:, 1])
+        steps = (lengths / (self.cell / 2)).astype(np.int64) + 2
+        owner = np.repeat(np.arange(len(segs)), steps)
+        t = (np.arange(len(owner)) - np.repeat(np.cumsum(steps) - steps, steps)) / np.repeat(steps - 1, steps)
+        s = segs[owner]
+        cx = ((s[:, 0] + t * (s[:, 2] - s[:, 0])) // self.cell).astype(np.int64)
+        cy = ((s[:, 1] + t * (s[:, 3] - s[:, 1])) // self.cell).astype(np.int64)
+        ox, oy = np.meshgrid([-1, 0, 1], [-1, 0, 1])
+        cx = np.clip(cx[:, None] + ox.ravel(), 0, self.nx - 1)
+        cy = np.clip(cy[:, None] + oy.ravel(), 0, self.ny - 1)
+        # Unique (segment, cell) pairs, then every pixel of each cell
+        num_cells = self.nx * self.ny
+        pairs = np.unique(owner[:, None] * num_cells + cx * self.ny + cy)
+        seg_ids, cells = pairs // num_cells, pairs % num_cells
+        lo = np.searchsorted(self.keys, cells, side="left")
+        hi = np.searchsorted(self.keys, cells, side="right")
+        idx = _expand_ranges(lo, hi)
+        return np.repeat(seg_ids, hi - lo), self.xs[idx], self.ys[idx]
+
+def refine_segments(segs, seg_ids, xs, ys, band_px, min_length_px, max_gap_px):
+    """
+    Fits each wall line to the pixels within band_px of its coarse segment and splits it at gaps.
+
+    Each segment's line is a least-squares offset + slope against the coarse direction,
+    computed for all segments at once with bincount sums. Runs of pixels along the line
+    separated by more than max_gap_px become separate segments; runs shorter than
+    min_length_px are dropped.
+
+    Returns:
+        np.ndarray: (M, 4) int64 refined segments.
+    """
+    x1, y1 = segs[:, 0], segs[:, 1]
+    lengths = np.hypot(segs[:, 2] - x1, segs[:, 3] - y1)
+    valid = lengths > 0
+    ux, uy = np.zeros(len(segs)), np.zeros(len(segs))
+    ux[valid], uy[valid] = (segs[valid, 2] - x1[valid]) / lengths[valid], (segs[valid, 3] - y1[valid]) / lengths[valid]
+
+    dx, dy = xs - x1[seg_ids], ys - y1[seg_ids]
+    t = dx * ux[seg_ids] + dy * uy[seg_ids]
+    d = -dx * uy[seg_ids] + dy * ux[seg_ids]
+    keep = valid[seg_ids] & (np.abs(d) <= band_px) & (t >= -band_px) & (t <= lengths[seg_ids] + band_px)
+    seg_ids, t, d = seg_ids[keep], t[keep], d[keep]
+    if not len(t): return np.empty((0, 4), dtype=np.int64)
+
+    # Least-squares line d = offset + slope * t per segment
+    n = np.bincount(seg_ids, minlength=len(segs)).astype(np.float64)
+    has = n > 0
+    t_mean, d_mean = np.zeros(len(segs)), np.zeros(len(segs))
+    t_mean[has] = np.bincount(seg_ids, t, len(segs))[has] / n[has]
+    d_mean[has] = np.bincount(seg_ids, d, len(segs))[has] / n[has]
+    tc, dc = t - t_mean[seg_ids], d - d_mean[seg_ids]
+    var_t, cov_td = np.bincount(seg_ids, tc * tc, len(segs)), np.bincount(seg_ids, tc * dc, len(segs))
+    slope = np.divide(cov_td, var_t, out=np.zeros(len(segs)), where=var_t > 0)
+    offset = d_mean - slope * t_mean
+
+    # Runs along each line: break where the segment changes or the pixels leave a gap
+    order = np.lexsort((t, seg_ids))
+    seg_ids, t = seg_ids[order], t[order]
+    breaks = np.flatnonzero((np.diff(seg_ids) != 0) | (np.diff(t) > max_gap_px)) + 1
+    starts = np.concatenate([[0], breaks])
+    ends = np.concatenate([breaks, [len(t)]]) - 1
+    long_enough = t[ends] - t[starts] >= min_length_px
+    starts, ends = starts[long_enough], ends[long_enough]
+    owner = seg_ids[starts]
+
+    def point(tt):
+        off = offset[owner] + slope[owner] * tt
+        return x1[owner] + tt * ux[owner] - off * uy[owner], y1[owner] + tt * uy[owner] + off * ux[owner]
+
+    (ax, ay), (bx, by) = point(t[starts]), point(t[ends])
+    return np.rint(np.stack([ax, ay, bx, by], axis=1)).astype(np.int64)
+
+def detect_raw_lines_pyramid(occupancy_img, hough_min_line_length_px, hough_max_line_gap_px, params,
+                             levels, angle_thresh_deg, merge_dist_thresh_px):
+    """
+    Coarse Hough on a 2**levels downsampled map, refined at full resolution.
+
+    Returns:
+        np.ndarray: Raw segments as an (N, 1, 4) int32 array, like detect_raw_lines.
+    """
+    factor = 2 ** levels
+    small = downsample_occupancy(occupancy_img, factor)
+    coarse_params = dict(params, HOUGH_THRESHOLD=scale_to_level(params.get("HOUGH_THRESHOLD"), factor))
+    print(f"Pyramid level {levels}: {small.shape[1]}x{small.shape[0]} px (1/{factor})")
+    coarse = detect_raw_lines_occupancy(small, scale_to_level(hough_min_line_length_px, factor),
+                                        scale_to_level(hough_max_line_gap_px, factor), coarse_params)
+    if not len(coarse): return np.empty((0, 1, 4), dtype=np.int32)
+    # Merging at the coarse level removes the duplicate candidates of thick walls
+    coarse = merge_lines_indexed(coarse, angle_thresh_deg, scale_to_level(merge_dist_thresh_px, factor))
+    # Block centers back in full-resolution pixels
+    candidates = _segment_array(coarse) * factor + (factor - 1) / 2
+
+    band_px = factor + 1
+    index = _PixelIndex(occupancy_img, band_px + 2)
+    seg_ids, xs, ys = index.near_segments(candidates)
+    refined = refine_segments(candidates, seg_ids, xs, ys, band_px, hough_min_line_length_px, hough_max_line_gap_px)
+    print(f"  Refined {len(coarse)} coarse candidates into {len(refined)} full-resolution segments.")
+    return refined.astype(np.int32).reshape(-1, 1, 4)
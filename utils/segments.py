@@ -0,0 +1,108 @@
+import itertools
+import math
+import numpy as np
+
+# --- Columnar Wall Segments ---
+
+class WallSegments:
+    """
+    Wall segments as contiguous columns instead of [[x1, y1, x2, y2]] lists.
+
+    endpoints is an (N, 4) int32 array of pixel coordinates (x right, y down, as drawn).
+    Angle (degrees in [0, 180), same convention as get_line_properties), length and
+    midpoint are computed once for all segments, as float32, on first use.
+    With the map resolution, origin and height (from the map YAML and image), the
+    segments convert to ROS world coordinates in meters.
+    """
+
+    def __init__(self, endpoints, resolution=None, origin=None, map_shape=None):
+        self.endpoints = np.ascontiguousarray(np.asarray(endpoints, dtype=np.int32).reshape(-1, 4))
+        self.resolution = resolution
+        self.origin = None if origin is None else [float(v) for v in origin]
+        self.map_shape = None if map_shape is None else tuple(int(v) for v in map_shape[:2])
+        self._angles = self._lengths = self._midpoints = None
+
+    @classmethod
+    def from_lines(cls, lines, **metadata):
+        """Builds segments from Hough output ((N, 1, 4) array) or [[x1, y1, x2, y2]] lists."""
+        if lines is None or len(lines) == 0: return cls(np.empty((0, 4), dtype=np.int32), **metadata)
+        if isinstance(lines, np.ndarray): return cls(lines, **metadata)
+        flat = np.fromiter(itertools.chain.from_iterable(line[0] for line in lines), dtype=np.int32, count=4 * len(lines))
+        return cls(flat, **metadata)
+
+    def __len__(self):
+        return len(self.endpoints)
+
+    def to_lines(self):
+        """[[x1, y1, x2, y2]] lists, as returned by merge_lines."""
+        return [[row] for row in self.endpoints.tolist()]
+
+    @property
+    def angles(self):
+        if self._angles is None:
+            dx, dy = self._deltas()
+            angles = np.degrees(np.arctan2(dy, dx))
+            angles[angles < 0] += 180
+            angles[angles >= 179.999] = 0.0
+            self._angles = angles.astype(np.float32)
+        return self._angles
+
+    @property
+    def lengths(self):
+        if self._lengths is None:
+            dx, dy = self._deltas()
+            self._lengths = np.hypot(dx, dy).astype(np.float32)
+        return self._lengths
+
+    @property
+    def midpoints(self):
+        if self._midpoints is None:
+            e = self.endpoints
+            self._midpoints = ((e[:, 0:2] + e[:, 2:4]) / 2).astype(np.float32)
+        return self._midpoints
+
+    def _deltas(self):
+        e = self.endpoints.astype(np.float64)
+        return e[:, 2] - e[:, 0], e[:, 3] - e[:, 1]
+
+    def world_endpoints(self):
+        """
+        Endpoints in meters in the map frame, as an (N, 4) float64 array [x1, y1, x2, y2].
+
+        Follows map_server: origin is the pose of the lower-left pixel, image rows grow
+        downwards while world y grows upwards, and pixel coordinates are cell centers.
+        """
+        if self.resolution is None or self.origin is None or self.map_shape is None:
+            raise ValueError("World coordinates need the map resolution, origin and shape")
+        height = self.map_shape[0]
+        cols = self.endpoints[:, [0, 2]] + 0.5
+        rows = height - (self.endpoints[:, [1, 3]] + 0.5)
+        x, y = cols * self.resolution, rows * self.resolution
+        yaw = self.origin[2] if len(self.origin) > 2 else 0.0
+        if yaw:
+            c, s = math.cos(yaw), math.sin(yaw)
+            x, y = c * x - s * y, s * x + c * y
+        world = np.empty((len(self), 4), dtype=np.float64)
+        world[:, 0::2] = x + self.origin[0]
+        world[:, 1::2] = y + self.origin[1]
+        return world
+
+    def world_lengths(self):
+        """Segment lengths in meters."""
+        if self.resolution is None: raise ValueError("Lengths in meters need the map resolution")
+        return self.lengths * np.float32(self.resolution)
+
+    def save(self, path):
+        """Saves endpoints and map metadata to an .npz file."""
+        np.savez(path, endpoints=self.endpoints,
+                 resolution=np.float64(np.nan if self.resolution is None else self.resolution),
+                 origin=np.asarray(self.origin if self.origin is not None else [], dtype=np.float64),
+                 map_shape=np.asarray(self.map_shape if self.map_shape is not None else [], dtype=np.int64))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            resolution = float(data["resolution"])
+            origin, map_shape = data["origin"].tolist(), data["map_shape"].tolist()
+            return cls(data["endpoints"], resolution=None if math.isnan(resolution) else resolution,
+                       origin=origin or None, map_shape=map_shape or None)
@@ -0,0 +1,134 @@
+import contextlib
+import io
+import numpy as np
+from utils.utils import load_map
+from utils.mapfile import read_pgm_header
+from utils.preprocess import binarize_and_clean
+from utils.wall_detection import detect_raw_lines_occupancy, group_lines_indexed, _segment_array, _group_extents_pca
+
+# --- Memory-mapped PGM Input ---
+
+def open_map_memmap(filename):
+    """
+    Memory-maps a binary PGM so tiles are read from disk on demand.
+    Falls back to a full load_map for other formats (ASCII PGM, PNG, ...).
+    """
+    header = read_pgm_header(filename)
+    if header is None:
+        print(f"Warning: {filename} is not a binary PGM, loading it fully instead of memory-mapping.")
+        return load_map(filename)
+    width, height, maxval, offset = header
+    dtype = np.uint8 if maxval < 256 else np.dtype('>u2')
+    img = np.memmap(filename, dtype=dtype, mode='r', offset=offset, shape=(height, width))
+    print(f"Memory-mapped map: {filename}, shape: {img.shape}, dtype: {img.dtype}")
+    return img
+
+# --- Tiling ---
+
+# Segments are clipped to their tile's core, so the pieces of a wall that crosses a seam end
+# one pixel apart on either side of it. Pieces this close are stitched back together.
+SEAM_STITCH_PX = 2
+
+def tile_margin_px(params, hough_max_line_gap_px):
+    """
+    Overlap needed around a tile: the morphology dependency radius (opening and closing,
+    each an erosion plus a dilation) plus the Hough gap so segments can bridge the seam.
+    """
+    open_k = max(params.get("MORPH_OPEN_KERNEL_SIZE"))
+    close_k = max(params.get("MORPH_CLOSE_KERNEL_SIZE"))
+    morph_pad = 2 * (open_k // 2) + 2 * (close_k // 2)
+    return morph_pad + hough_max_line_gap_px
+
+def tile_windows(shape, tile_size, margin):
+    """Yields (core, padded) windows as (y0, y1, x0, x1) tuples covering the map."""
+    height, width = shape[:2]
+    for y0 in range(0, height, tile_size):
+        for x0 in range(0, width, tile_size):
+            y1, x1 = min(height, y0 + tile_size), min(width, x0 + tile_size)
+            padded = (max(0, y0 - margin), min(height, y1 + margin), max(0, x0 - margin), min(width, x1 + margin))
+            yield (y0, y1, x0, x1), padded
+
+def _near_seam(coord, tile_size, extent, dist_px):
+    """True where a coordinate lies within dist_px of an interior tile seam (multiples of tile_size)."""
+    last_seam = (extent - 1) // tile_size
+    if last_seam < 1: return np.zeros(len(coord), dtype=bool)
+    nearest = np.clip(np.rint(coord / tile_size), 1, last_seam) * tile_size
+    return np.abs(coord - nearest) <= dist_px
+
+def clip_segments(segs, x0, y0, x1, y1):
+    """
+    Clips (N, 4) segments to the box [x0, x1] x [y0, y1] (Liang-Barsky).
+    Segments that miss the box are dropped; the rest are returned with rounded endpoints.
+    """
+    start = segs[:, :2].astype(np.float64)
+    delta = segs[:, 2:].astype(np.float64) - start
+    t0, t1 = np.zeros(len(segs)), np.ones(len(segs))
+    for axis, lo, hi in ((0, x0, x1), (1, y0, y1)):
+        d, p = delta[:, axis], start[:, axis]
+        moving = d != 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ta, tb = (lo - p) / d, (hi - p) / d
+        t0 = np.where(moving, np.maximum(t0, np.minimum(ta, tb)), t0)
+        t1 = np.where(moving, np.minimum(t1, np.maximum(ta, tb)), t1)
+        # Segments parallel to this axis are kept only if they lie between lo and hi
+        t1[~moving & ((p < lo) | (p > hi))] = -1
+    keep = t0 <= t1
+    clipped = np.concatenate([start + t0[:, None] * delta, start + t1[:, None] * delta], axis=1)
+    return np.rint(clipped[keep]).astype(np.int64)
+
+def stitch_border_segments(segs, tile_size, shape, angle_thresh_deg, dist_px=SEAM_STITCH_PX):
+    """
+    Joins segments that were split by tile seams (segments clipped to their tile's core).
+    Only segments with an endpoint within dist_px of a seam are considered; collinear groups
+    are replaced by their principal-direction extent until no more pieces join (a wall can cross
+    several seams). Unlike the farthest pair, that extent stays on the centre line of thick walls.
+    """
+    if not len(segs): return segs
+    height, width = shape[:2]
+    near = np.zeros(len(segs), dtype=bool)
+    for col in (0, 2):
+        near |= _near_seam(segs[:, col], tile_size, width, dist_px)
+    for col in (1, 3):
+        near |= _near_seam(segs[:, col], tile_size, height, dist_px)
+    if near.sum() < 2: return segs
+    border = segs[near]
+    while len(border) > 1:
+        groups = group_lines_indexed(border, angle_thresh_deg, dist_px)
+        if len(groups) == len(border): break
+        border = _group_extents_pca(border, groups)
+    print(f"  Stitched {int(near.sum())} seam segments into {len(border)}.")
+    return np.concatenate([segs[~near], border])
+
+def detect_raw_lines_tiled(map_img, negate, params, hough_min_line_length_px, hough_max_line_gap_px, tile_size):
+    """
+    Runs binarize_and_clean -> detect_raw_lines_occupancy tile by tile over a (memory-mapped)
+    map, so peak memory depends on the tile size rather than the map size.
+    Returns raw segments in the same (N, 1, 4) layout as detect_raw_lines.
+
+    Each tile is padded by tile_margin_px plus TILE_OVERLAP_PX. The extra overlap only gives
+    Hough more of the walls that cross the tile: a tile's Hough sees fewer collinear pixels
+    than a whole-map run, so short walls fall below the vote threshold more often.
+    """
+    margin = tile_margin_px(params, hough_max_line_gap_px) + (params.get("TILE_OVERLAP_PX") or 0)
+    print(f"Detecting raw line segments in {tile_size}px tiles (margin {margin}px)...")
+
+    tile_segments = []
+    buffers = None # Reused across equally sized tiles
+    num_tiles = 0
+    for (y0, y1, x0, x1), (py0, py1, px0, px1) in tile_windows(map_img.shape, tile_size, margin):
+        num_tiles += 1
+        tile = np.ascontiguousarray(map_img[py0:py1, px0:px1])
+        with contextlib.redirect_stdout(io.StringIO()): # Per-tile logs would drown the summary
+            buffers = binarize_and_clean(tile, negate, params, buffers)
+            lines = detect_raw_lines_occupancy(buffers[1], hough_min_line_length_px, hough_max_line_gap_px, params)
+        if not len(lines): continue
+        segs = _segment_array(lines) + np.array([px0, py0, px0, py0])
+        # Keep the part of each segment inside this tile's core; the overlap belongs to the neighbours
+        tile_segments.append(clip_segments(segs, x0, y0, x1 - 1, y1 - 1))
+
+    segs = np.concatenate(tile_segments) if tile_segments else np.empty((0, 4), dtype=np.int64)
+    print(f"  {num_tiles} tiles produced {len(segs)} raw line segments.")
+    stitch_angle = 2 * params.get("HOUGH_THETA") # Two Hough angle bins
+    segs = stitch_border_segments(segs, tile_size, map_img.shape, stitch_angle)
+    if not len(segs): return []
+    return segs.astype(np.int32).reshape(-1, 1, 4)
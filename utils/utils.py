@@ -1,35 +1,9 @@
 import cv2
 import numpy as np
-import yaml
 import os
-
-def load_yaml_metadata(yaml_filename,params):
-    metadata = {
-        'resolution': params.get("DEFAULT_RESOLUTION"), 'negate': params.get("DEFAULT_NEGATE"), 'origin': params.get("DEFAULT_ORIGIN"),
-        'occupied_thresh': 0.65, 'free_thresh': 0.196, 'image': None
-    }
-    try:
-        with open(yaml_filename, 'r') as f: yaml_data = yaml.safe_load(f)
-        if not yaml_data: return metadata # Empty YAML
-
-        metadata['resolution'] = float(yaml_data.get('resolution', metadata['resolution']))
-        metadata['negate'] = int(yaml_data.get('negate', metadata['negate']))
-        origin_yaml = yaml_data.get('origin', metadata['origin'])
-        if isinstance(origin_yaml, list) and len(origin_yaml) >= 2:
-             metadata['origin'] = [float(origin_yaml[0]), float(origin_yaml[1]), float(origin_yaml[2]) if len(origin_yaml) > 2 else 0.0]
-        metadata['occupied_thresh'] = float(yaml_data.get('occupied_thresh', metadata['occupied_thresh']))
-        metadata['free_thresh'] = float(yaml_data.get('free_thresh', metadata['free_thresh']))
-        metadata['image'] = yaml_data.get('image', metadata['image'])
-        print(f"Loaded YAML: Res={metadata['resolution']}, Negate={metadata['negate']}, Origin={metadata['origin']}, Image={metadata['image']}")
-
-        if metadata['image'] and not os.path.isabs(metadata['image']):
-             yaml_dir = os.path.dirname(os.path.abspath(yaml_filename))
-             metadata['image'] = os.path.join(yaml_dir, metadata['image'])
-             metadata['image'] = os.path.normpath(metadata['image'])
-             print(f"  Resolved Image Path: {metadata['image']}")
-    except FileNotFoundError: print(f"Warning: YAML file not found: {yaml_filename}. Using defaults.")
-    except Exception as e: print(f"Warning: Error loading YAML {yaml_filename}: {e}. Using defaults.")
-    return metadata
+import gzip
+import itertools
+from utils.mapfile import load_yaml_metadata # Re-exported: lives in mapfile so it loads without OpenCV
 
 def load_map(filename):
     if not filename or not os.path.exists(filename): return None
@@ -42,6 +16,23 @@ def load_map(filename):
 
 # --- Drawing and Saving Functions ---
 
+def _flat_coords(lines):
+    """x1, y1, x2, y2 of every segment in one flat list of ints."""
+    if lines is None or len(lines) == 0: return []
+    if isinstance(lines, np.ndarray): return lines.ravel().tolist()
+    return list(itertools.chain.from_iterable(line[0] for line in lines))
+
+def segment_points(lines):
+    """Segments as an (N, 2, 2) int32 array of endpoint pairs, for batched drawing."""
+    if isinstance(lines, np.ndarray): return lines.astype(np.int32, copy=False).reshape(-1, 2, 2)
+    return np.array(_flat_coords(lines), dtype=np.int32).reshape(-1, 2, 2)
+
+def draw_segments(img, lines, color, thickness):
+    """Draws all segments with a single cv2.polylines call. Returns the number drawn."""
+    pts = segment_points(lines)
+    if len(pts): cv2.polylines(img, pts, False, color, thickness)
+    return len(pts)
+
 def draw_debug_lines(map_shape, lines, color, output_path, params, background_map=None):
     """Draws lines on a white or provided background image for debugging."""
     if background_map is None:
@@ -52,26 +43,21 @@ def draw_debug_lines(map_shape, lines, color, output_path, params, background_ma
         else:
             debug_img = background_map.copy() # Assume BGR
 
-    num_drawn = 0
-    if lines is not None and len(lines) > 0:
-        for line in lines:
-            x1, y1, x2, y2 = line[0]
-            cv2.line(debug_img, (x1, y1), (x2, y2), color, 1) # Draw thin lines
-            num_drawn += 1
+    num_drawn = draw_segments(debug_img, lines, color, 1) # Draw thin lines
     print(f"Drawing {num_drawn} lines for debug image {output_path}")
     try: cv2.imwrite(output_path, debug_img)
     except Exception as e: print(f"Error saving debug image {output_path}: {e}")
 
-def draw_raster_floorplan(map_shape, wall_lines, output_path,params):
-    """Draws the final raster floor plan with merged walls and saves it."""
+def render_raster_floorplan(map_shape, wall_lines, params):
+    """Draws the final raster floor plan with merged walls and returns the BGR image."""
     output_img = np.full((map_shape[0], map_shape[1], 3), params.get("BACKGROUND_COLOR_BGR"), dtype=np.uint8)
-    num_drawn_walls = 0
-    if wall_lines is not None and len(wall_lines) > 0:
-        for line in wall_lines:
-            x1, y1, x2, y2 = line[0]
-            cv2.line(output_img, (x1, y1), (x2, y2), params.get("WALL_COLOR_BGR"), params.get("WALL_THICKNESS_PX"))
-            num_drawn_walls += 1
+    num_drawn_walls = draw_segments(output_img, wall_lines, params.get("WALL_COLOR_BGR"), params.get("WALL_THICKNESS_PX"))
     print(f"Drawing final raster floorplan with {num_drawn_walls} wall segments.")
+    return output_img
+
+def draw_raster_floorplan(map_shape, wall_lines, output_path,params):
+    """Draws the final raster floor plan with merged walls and saves it."""
+    output_img = render_raster_floorplan(map_shape, wall_lines, params)
 
     try:
         cv2.imwrite(output_path, output_img)
@@ -81,30 +67,50 @@ def draw_raster_floorplan(map_shape, wall_lines, output_path,params):
         print(f"Error saving raster output image {output_path}: {e}")
         return False
 
-def save_svg_floorplan(map_shape, wall_lines, output_path):
-    """Saves the final floor plan walls as an SVG vector file."""
-    print(f"Saving vector floorplan to {output_path}...")
+def render_svg_floorplan(map_shape, wall_lines, params=None):
+    """
+    Returns the floor plan walls as SVG text.
+
+    Walls are <line> elements in one styled group, or a single <path> when
+    params["SVG_SINGLE_PATH"] is set (much smaller files for large maps).
+    All segments are formatted in one pass from the segment array.
+    """
+    params = params or {}
     width, height = map_shape[1], map_shape[0] # SVG uses width, height
+    color, stroke_width = params.get("SVG_WALL_COLOR", "black"), params.get("SVG_STROKE_WIDTH", "2")
+    coords = _flat_coords(wall_lines)
+    num_lines = len(coords) // 4
+    # SVG Header
+    parts = [f'<svg width="{width}" height="{height}" xmlns="http://www.w3.org/2000/svg">\n']
+
+    # SVG Lines for walls
+    if num_lines:
+        coords = tuple(coords)
+        if params.get("SVG_SINGLE_PATH"):
+            parts.append(f'  <path fill="none" stroke="{color}" stroke-width="{stroke_width}" d="')
+            parts.append(("M%d %dL%d %d" * num_lines) % coords)
+            parts.append('" />\n')
+        else:
+            parts.append(f'  <g stroke="{color}" stroke-width="{stroke_width}">\n')
+            parts.append(('    <line x1="%d" y1="%d" x2="%d" y2="%d" />\n' * num_lines) % coords)
+            parts.append('  </g>\n')
+
+    # SVG Footer
+    parts.append('</svg>\n')
+    return "".join(parts)
+
+def save_svg_floorplan(map_shape, wall_lines, output_path, params=None):
+    """Saves the final floor plan walls as an SVG vector file (gzip-compressed if the path ends in .svgz)."""
+    print(f"Saving vector floorplan to {output_path}...")
+    num_lines_saved = len(wall_lines) if wall_lines is not None else 0
 
     try:
-        with open(output_path, 'w') as f:
-            # SVG Header
-            f.write(f'<svg width="{width}" height="{height}" xmlns="http://www.w3.org/2000/svg">\n')
-
-            # SVG Lines for walls
-            num_lines_saved = 0
-            if wall_lines is not None and len(wall_lines) > 0:
-                f.write('  <g stroke="{SVG_WALL_COLOR}" stroke-width="{SVG_STROKE_WIDTH}">\n')
-                for line in wall_lines:
-                    x1, y1, x2, y2 = line[0]
-                    f.write(f'    <line x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}" />\n')
-                    num_lines_saved += 1
-                f.write('  </g>\n')
-
-            # SVG Footer
-            f.write('</svg>\n')
+        if output_path.endswith(".svgz"): f = gzip.open(output_path, 'wt', compresslevel=6)
+        else: f = open(output_path, 'w')
+        with f:
+            f.write(render_svg_floorplan(map_shape, wall_lines, params))
         print(f"--- Vector floor plan saved successfully with {num_lines_saved} lines to {output_path} ---")
         return True
     except Exception as e:
         print(f"Error saving SVG output file {output_path}: {e}")
-        return False
\ No newline at end of file
+        return False
@@ -2,11 +2,19 @@ import cv2
 import numpy as np
 import math
 
+# Parameters read by detect_raw_lines besides the pixel length/gap (used to key cached results)
+HOUGH_PARAMS = ("HOUGH_RHO", "HOUGH_THETA", "HOUGH_THRESHOLD")
+
 def detect_raw_lines(cleaned_binary_img, hough_min_line_length_px, hough_max_line_gap_px,params):
     if cleaned_binary_img is None: return None
     inverted_cleaned_img = cv2.bitwise_not(cleaned_binary_img)
+    return detect_raw_lines_occupancy(inverted_cleaned_img, hough_min_line_length_px, hough_max_line_gap_px, params)
+
+def detect_raw_lines_occupancy(occupancy_img, hough_min_line_length_px, hough_max_line_gap_px, params):
+    """Hough detection on an occupied = 255 image (binarize_and_clean output), without inverting it."""
+    if occupancy_img is None: return None
     print("Detecting raw line segments using Hough Transform...")
-    lines = cv2.HoughLinesP(inverted_cleaned_img, params.get("HOUGH_RHO"), (np.pi / 180)*params.get("HOUGH_THETA"), params.get("HOUGH_THRESHOLD"),
+    lines = cv2.HoughLinesP(occupancy_img, params.get("HOUGH_RHO"), (np.pi / 180)*params.get("HOUGH_THETA"), params.get("HOUGH_THRESHOLD"),
                             minLineLength=hough_min_line_length_px, maxLineGap=hough_max_line_gap_px)
     if lines is None: print("  Hough Transform detected no lines."); return []
     print(f"  Hough Transform detected {len(lines)} raw line segments.")
@@ -112,8 +120,181 @@ def merge_lines(lines, angle_thresh_deg, dist_thresh_px):
             merged_lines_final.append([[int(pt1[0]), int(pt1[1]), int(pt2[0]), int(pt2[1])]])
 
             # --- Method 2 (Alternative): Fit line with PCA, project points, find min/max projection ---
-            # Requires more complex implementation, potentially more robust for noisy points
-            # Placeholder: Use Method 1 for now.
+            # See _group_extents_pca (merge_lines_indexed(..., extent_method="pca")).
+
+    print(f"  Merged into {len(merged_lines_final)} final line segments.")
+    return merged_lines_final
+
+# --- Indexed Line Merging ---
+
+def _segment_array(lines):
+    """Flattens Hough output ([[x1, y1, x2, y2]], ...) into an (N, 4) int64 array."""
+    return np.asarray(lines, dtype=np.int64).reshape(-1, 4)
+
+def _segment_angles(segs):
+    """Vectorized get_line_properties angle for an (N, 4) array, degrees in [0, 180)."""
+    angles = np.degrees(np.arctan2(segs[:, 3] - segs[:, 1], segs[:, 2] - segs[:, 0]))
+    angles[angles < 0] += 180
+    angles[angles >= 179.999] = 0.0
+    return angles
+
+def _expand_ranges(lo, hi):
+    """Concatenates the index ranges [lo[k], hi[k]) into one array."""
+    lens = hi - lo
+    total = int(lens.sum())
+    if total == 0: return np.empty(0, dtype=np.int64)
+    offsets = np.repeat(lo - (np.cumsum(lens) - lens), lens)
+    return offsets + np.arange(total)
+
+def _farthest_pair(points):
+    """First farthest pair of points in row-major scan order (same tie-breaking as the nested loop)."""
+    diff = points[:, None, :] - points[None, :, :]
+    dist_sq = (diff * diff).sum(axis=2)
+    a, b = np.unravel_index(np.argmax(dist_sq), dist_sq.shape)
+    return points[a], points[b]
+
+class _SegmentIndex:
+    """Endpoints bucketed by (angle bin, grid cell), stored as sorted integer keys."""
+
+    def __init__(self, segs, angles, angle_thresh_deg, cell_size):
+        self.cell = cell_size
+        # Bin width slightly above the angle threshold, so similar angles are at most one bin apart
+        self.num_bins = int(min(180, 180 / angle_thresh_deg * (1 - 1e-6))) if angle_thresh_deg > 0 else 1
+        if self.num_bins < 3: self.num_bins = 1
+        self.bins = np.minimum((angles * self.num_bins / 180).astype(np.int64), self.num_bins - 1)
+
+        xs = np.concatenate([segs[:, 0], segs[:, 2]])
+        ys = np.concatenate([segs[:, 1], segs[:, 3]])
+        self.x_min, self.y_min = int(xs.min()), int(ys.min())
+        cx = np.floor_divide(xs - self.x_min, cell_size).astype(np.int64)
+        cy = np.floor_divide(ys - self.y_min, cell_size).astype(np.int64)
+        self.nx, self.ny = int(cx.max()) + 1, int(cy.max()) + 1
+        keys = (np.tile(self.bins, 2) * self.nx + cx) * self.ny + cy
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.owner = order % len(segs) # endpoint -> segment index
+
+    def candidates(self, i, seg, dist):
+        """Segments in angle bins next to segment i with an endpoint inside its bbox grown by dist."""
+        x0 = max(0, int((min(seg[0], seg[2]) - self.x_min - dist) // self.cell))
+        x1 = min(self.nx - 1, int((max(seg[0], seg[2]) - self.x_min + dist) // self.cell))
+        y0 = max(0, int((min(seg[1], seg[3]) - self.y_min - dist) // self.cell))
+        y1 = min(self.ny - 1, int((max(seg[1], seg[3]) - self.y_min + dist) // self.cell))
+        if x0 > x1 or y0 > y1: return np.empty(0, dtype=np.int64)
+        b = int(self.bins[i])
+        bins = np.unique([(b - 1) % self.num_bins, b, (b + 1) % self.num_bins])
+        cols = np.arange(x0, x1 + 1)
+        base = ((bins[:, None] * self.nx + cols[None, :]) * self.ny).ravel()
+        lo = np.searchsorted(self.keys, base + y0, side="left")
+        hi = np.searchsorted(self.keys, base + y1, side="right")
+        return np.unique(self.owner[_expand_ranges(lo, hi)])
+
+def group_lines_indexed(segs, angle_thresh_deg, dist_thresh_px):
+    """
+    Groups an (N, 4) segment array with the merge_lines heuristic, using a spatial/angle
+    index and batched NumPy distances instead of per-pair checks.
+    Returns one index array per group: the seed first, then absorbed segments in ascending order.
+    """
+    num_lines = len(segs)
+    angles = _segment_angles(segs)
+    index = _SegmentIndex(segs, angles, angle_thresh_deg, max(1.0, float(dist_thresh_px)))
+    merged_mask = np.zeros(num_lines, dtype=bool)
+    groups = []
+
+    for i in range(num_lines):
+        if merged_mask[i]: continue
+        merged_mask[i] = True
+        seg_i = segs[i]
+
+        # Every accepted j has at least one endpoint within dist_thresh_px of segment i
+        cand = index.candidates(i, seg_i, dist_thresh_px)
+        cand = cand[(cand > i) & ~merged_mask[cand]]
+        if len(cand):
+            # 1. Angle similarity
+            angle_diff = np.abs(angles[i] - angles[cand])
+            angle_diff = np.minimum(angle_diff, 180 - angle_diff)
+            cand = cand[angle_diff < angle_thresh_deg]
+        if len(cand):
+            # 2. Spatial proximity (endpoint distances and endpoint-to-segment distances)
+            seg_j = segs[cand]
+            ends_i = seg_i.reshape(2, 2)
+            ends_j = seg_j.reshape(-1, 2, 2)
+            d_end = np.sqrt(((ends_j[:, :, None, :] - ends_i[None, None, :, :]) ** 2).sum(axis=3))
+            min_endpoint_dist = d_end.reshape(-1, 4).min(axis=1)
+
+            ax, ay, bx, by = seg_i
+            seg_len_sq = (bx - ax)**2 + (by - ay)**2
+            px, py = ends_j[:, :, 0], ends_j[:, :, 1]
+            if seg_len_sq == 0:
+                dist_j_i = np.sqrt((px - ax)**2 + (py - ay)**2)
+            else:
+                t = ((px - ax) * (bx - ax) + (py - ay) * (by - ay)) / seg_len_sq
+                t = np.clip(t, 0, 1)
+                dist_j_i = np.sqrt((px - (ax + t * (bx - ax)))**2 + (py - (ay + t * (by - ay)))**2)
+
+            close = (min_endpoint_dist < dist_thresh_px) | (dist_j_i < dist_thresh_px).all(axis=1)
+            cand = cand[close]
+            merged_mask[cand] = True
+
+        groups.append(np.concatenate([[i], cand]).astype(np.int64))
+    return groups
+
+# --- Group Extents ---
+
+def _group_extents_farthest(segs, groups):
+    """Method 1: farthest pair of endpoints in each group (O(k^2) per group)."""
+    extents = np.empty((len(groups), 4), dtype=np.int64)
+    for g, members in enumerate(groups):
+        pt1, pt2 = _farthest_pair(segs[members].reshape(-1, 2))
+        extents[g] = (pt1[0], pt1[1], pt2[0], pt2[1])
+    return extents
+
+def _group_extents_pca(segs, groups):
+    """
+    Method 2: fit each group's principal direction and take the min/max projection of its
+    endpoints onto it. All groups are processed in one batched pass (O(k) per group).
+    """
+    sizes = np.array([len(g) for g in groups]) * 2
+    pts = segs[np.concatenate(groups)].reshape(-1, 2).astype(np.float64)
+    gid = np.repeat(np.arange(len(groups)), sizes)
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+
+    mean = np.stack([np.bincount(gid, pts[:, 0]), np.bincount(gid, pts[:, 1])], axis=1) / sizes[:, None]
+    centered = pts - mean[gid]
+    sxx = np.bincount(gid, centered[:, 0] * centered[:, 0])
+    syy = np.bincount(gid, centered[:, 1] * centered[:, 1])
+    sxy = np.bincount(gid, centered[:, 0] * centered[:, 1])
+    # Major axis of the 2x2 covariance matrix in closed form
+    theta = 0.5 * np.arctan2(2 * sxy, sxx - syy)
+    direction = np.stack([np.cos(theta), np.sin(theta)], axis=1)
+
+    proj = (centered * direction[gid]).sum(axis=1)
+    t_min = np.minimum.reduceat(proj, starts)
+    t_max = np.maximum.reduceat(proj, starts)
+    pt1 = mean + t_min[:, None] * direction
+    pt2 = mean + t_max[:, None] * direction
+    return np.rint(np.concatenate([pt1, pt2], axis=1)).astype(np.int64)
+
+EXTENT_METHODS = {
+    "farthest": _group_extents_farthest,
+    "pca": _group_extents_pca,
+}
+
+def merge_lines_indexed(lines, angle_thresh_deg, dist_thresh_px, extent_method="farthest"):
+    """
+    Merges collinear and close/overlapping line segments.
+    With extent_method="farthest" the output is identical to merge_lines; "pca" replaces the
+    farthest-pair search with a batched principal-direction projection.
+    """
+    if not len(lines): return []
+    if extent_method not in EXTENT_METHODS:
+        raise ValueError(f"Unknown extent method '{extent_method}', expected one of {sorted(EXTENT_METHODS)}")
+    print(f"Merging {len(lines)} raw lines (indexed, extent={extent_method})...")
+
+    segs = _segment_array(lines)
+    groups = group_lines_indexed(segs, angle_thresh_deg, dist_thresh_px)
+    extents = EXTENT_METHODS[extent_method](segs, groups)
+    merged_lines_final = [[[int(v) for v in row]] for row in extents]
 
     print(f"  Merged into {len(merged_lines_final)} final line segments.")
-    return merged_lines_final
\ No newline at end of file
+    return merged_lines_final